@@ -1,406 +1,703 @@
-# dash and plotly
-from dash import Dash, html, dcc, Input, Output
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-
-# data
-import pandas as pd
-import numpy as np
-from dateutil.parser import parse
-
-# results
-from scratch.create_dataframe import create_dataframe
-
-DOW_dict = {"Monday": 0,
-           "Tuesday": 1,
-           "Wednesday": 2,
-           "Thursday": 3,
-           "Friday": 4,
-           "Saturday": 5,
-           "Sunday": 6}
-
-# Result color map
-result_colors = {
-              "Total": "blue",
-              "No Response": "salmon",  
-              "Rejected": "crimson",
-              "Contacted": "gold",
-              "First Interview": "seagreen",
-              "Second Intervew": "mediumseagreen",
-              "Third Interview": "mediumaquamarine",
-              "Offer": "lime",
-              "Scam": "purple"
-}
+import argparse
+from collections import defaultdict
+import json
 
-# update results
-try:
-    create_dataframe()
-except FileNotFoundError as e:
-    print(e)
+from scratch.figure_cache import FigureCache, data_version
+from scratch.metrics import metrics, stage, run, configure
 
-# read in data
-df = pd.read_csv("scratch/Application_Results_12_31_2022.csv", index_col=0)
+# pandas, plotly and dash are imported by the stage that needs them, so `import app` stays cheap
 
-# vertical lines for time series
-resume_dates = ["2022-08-12", "2022-08-19", "2022-08-31", "2022-09-05"]
-interview_dates = df["Date_Applied"][df["Result"].str.contains("(?i)Interview")].values
-offer_dates = df["Date_Applied"][df["Result"].str.contains("Offer")].values
+# serialized figures for serve mode, dropped whenever the results file changes
+figure_cache = FigureCache()
 
-# convert Date_Applied column to datetime
-df["Date_Applied"] = pd.to_datetime(df["Date_Applied"])
+# latest count cube per results file, with the data version it was built from
+cubes = {}
 
-date_count = df.groupby("Date_Applied").size().reindex(pd.date_range(df["Date_Applied"].min(), df["Date_Applied"].max()), fill_value=0)
+# running totals behind the rates graph per results file, kept the same way; appends extend them
+rate_prefixes = {}
 
-def create_role_fig(dff):
-    # bar graph role groupby
-    role_group = dff.groupby(["Broad_Role", "Result"]).size().unstack()
+# bumped after every rebuild the log watcher makes, so open pages know to redraw
+data_revision = 0
 
-    role_group["Total"] = role_group.sum(axis=1)
+# how often open pages check for a rebuild, when watching the log
+LIVE_POLL_MS = 2000
 
-    role_group_to_bar = role_group.assign(temp_sum=role_group.sum(axis=1)) \
-        .sort_values(by="temp_sum", ascending=False).iloc[:,:-1] \
-        .reindex(role_group.mean(axis=0).sort_values(ascending=False).index, axis=1)
+# serve compacted figure JSON (typed arrays, defaults stripped) and compressed responses
+compact_payloads = False
 
-    role_group_fig = px.bar(role_group_to_bar,
-                barmode="group",
-                color_discrete_map=result_colors,
-                labels=dict(Broad_Role="Broad Role Category", 
-                            value="# of Applications"),
-                title="Application Results by Role Category"
-                )
-    
-    role_group_fig.update_layout(plot_bgcolor=bg_color, paper_bgcolor=bg_color)
-    
-    return role_group_fig, role_group_to_bar
-    
-def create_time_series_fig(dff):    
-    
-    time_series_fig = make_subplots(specs=[[{"secondary_y": True}]])
-
-    time_series_fig.add_bar(x=date_count.index, y=date_count.values, name="Daily Count", secondary_y=False)
-
-    time_series_fig.add_scatter(x=date_count.cumsum().index, y=date_count.cumsum().values, name="Cumulative Count", fillcolor="orange", secondary_y=True)
-
-    time_series_fig.update_layout(yaxis_range=[date_count.min(),date_count.max()+1], title_text="Applications Over Time",plot_bgcolor=bg_color, paper_bgcolor=bg_color)
-    time_series_fig.update_yaxes(title_text="# of Applications Per Day", secondary_y=False)
-    time_series_fig.update_yaxes(title_text="Cumulative # of Applications", secondary_y=True)
-
-    for i, x in enumerate(resume_dates):
-    #time_series_fig.add_vline(x=str(x), line_width=1, line_dash="dash", line_color="red")
-        time_series_fig.add_trace(go.Scatter(x=[str(x),str(x)], 
-                             y=[date_count.min(),date_count.max()+1], 
-                             mode='lines', 
-                             line=dict(color='red', width=2, dash='dash'),
-                             name="Resume Updated",
-                             legendgroup="Resume Updated",
-                             showlegend=False if i > 0 else True))
-
-    for i, x in enumerate(interview_dates):
-    #time_series_fig.add_vline(x=str(x), line_width=1, line_dash="dashdot", line_color="green")
-        time_series_fig.add_trace(go.Scatter(x=[str(x),str(x)], 
-                             y=[date_count.min(),date_count.max()+1], 
-                             mode='lines', 
-                             line=dict(color='green', width=1, dash='dashdot'),
-                             name="Application(s) Led to Interview",
-                             legendgroup="Application(s) Led to Interview",
-                             showlegend=False if i > 0 else True))
-
-    for i, x in enumerate(offer_dates):
-    #time_series_fig.add_vline(x=str(x), line_width=1, line_dash="longdashdot", line_color="black")
-        time_series_fig.add_trace(go.Scatter(x=[str(x),str(x)], 
-                         y=[date_count.min(),date_count.max()+1], 
-                         mode='lines', 
-                         line=dict(color='black', width=1, dash='longdashdot'),
-                         name="Application(s) Led to Offer",
-                         legendgroup="Application(s) Led to Offer",
-                         showlegend=False if i > 0 else True))
-    
-    
-    
-    return time_series_fig
-    
-def create_pie_fig(dff, rgroup):  
-    cats = ["Overall"] + list(rgroup.index)
+# compressed Dash bundles by (path, coding); they're fingerprinted, so never stale
+compressed_assets = {}
 
-    pie_fig = make_subplots(2, 3, subplot_titles=[cat + " Applications" for cat in cats], specs=[[{'type':'domain'}]*(len(cats) // 2), [{'type':'domain'}]*(len(cats) // 2)], row_heights=[0.7, 0.3])
+# figures drawn only from role, result and month totals; for a partitioned dataset they come
+# straight from its manifest unless a date range is picked
+MANIFEST_FIGURES = {"role_fig", "pie_fig", "category_pie_fig", "month_fig"}
 
-    s = pd.Series(result_colors).drop("Total").reindex(rgroup.drop("Total", axis=1).columns)
+# graphs the filter controls redraw, besides the pie
+FILTERED_GRAPHS = {'time-series': "time_series_fig",
+                   'waiting-time': "waiting_fig",
+                   'month-groups': "month_fig",
+                   'dow-groups': "dow_fig",
+                   'role-groups': "role_fig"}
 
-    i, j = 1, 1
-    for pie_category in cats:
 
-        pie_category = pie_category if pie_category is not None else "Overall"
+def results_file(results_path=None):
+    from scratch.create_dataframe import RESULTS_PATH
 
-        if pie_category == "Overall":
-            pie_fig.add_trace(go.Pie(values=dff["Result"].value_counts(), 
-                        labels=dff["Result"].value_counts().index,
-                        marker=dict(colors=s.reindex(dff["Result"].value_counts().index)),
-                        scalegroup='one',
-                        hole=0.4,
-                        name=""), i, j) 
+    return results_path or RESULTS_PATH
+
+
+# update results
+def build(log_path=None, results_path=None):
+    from scratch.create_dataframe import create_dataframe, LOG_PATH
+
+    try:
+        with run("build", log=log_path or LOG_PATH):
+            return create_dataframe(log_path or LOG_PATH, results_file(results_path), incremental=True)
+    except FileNotFoundError as e:
+        print(e)
+
+
+# read in data as one count cube (counted by the query backend), once per version of the
+# results file; a date range over a partitioned dataset only opens the months it overlaps.
+# With pandas a partitioned dataset is the sum of one cube per month file, each kept until
+# that file changes; the SQL engines count all the files in one query instead
+def load_cube(results_path, version, start=None, end=None):
+    from functools import reduce
+    from scratch.storage import is_partitioned, partition_files
+    from scratch.cube import merge_cubes, empty_cube
+    from scratch.query import query_cube, resolve_backend
+
+    def month_cubes(start=None, end=None):
+        return reduce(merge_cubes, [load_cube(path, data_version(path)) for path in partition_files(results_path, start, end)],
+                      empty_cube())
+
+    partitioned = is_partitioned(results_path)
+    by_month = partitioned and resolve_backend() == "pandas"
+    if partitioned and (start or end):
+        return month_cubes(start, end) if by_month else query_cube(results_path, start=start, end=end)
+
+    cached = cubes.get(results_path)
+    if cached is None or cached[0] != version:
+        cube = month_cubes() if by_month else query_cube(results_path)
+        cached = cubes[results_path] = (version, cube)
+    return cached[1]
+
+
+# running totals for the unfiltered rates graph, counted once per version of the results
+def load_rate_prefix(results_path, version):
+    from scratch.rates import rate_prefix
+
+    cached = rate_prefixes.get(results_path)
+    if cached is None or cached[0] != version:
+        cached = rate_prefixes[results_path] = (version, rate_prefix(load_cube(results_path, version)))
+    return cached[1]
+
+
+# cube for whole-history totals: the manifest's month-level counts for a partitioned dataset
+def summary_cube(results_path, version):
+    from scratch.storage import read_manifest, is_partitioned
+    from scratch.cube import manifest_cube
+
+    if not is_partitioned(results_path):
+        return load_cube(results_path, version)
+
+    cached = cubes.get((results_path, "manifest"))
+    if cached is None or cached[0] != version:
+        cached = cubes[(results_path, "manifest")] = (version, manifest_cube(read_manifest(results_path)))
+    return cached[1]
+
+
+# rebuild after the log changed; when the build only appended rows, just those rows are
+# counted and added to the cube and rate totals already in memory, anything else reloads them
+def refresh(log_path=None, results_path=None):
+    global data_revision
+    from scratch.storage import read_results
+    from scratch.cube import build_cube, merge_cubes
+    from scratch.rates import extend_rate_prefix
+
+    results_path = results_file(results_path)
+    cached = cubes.get(results_path)
+    cached_prefix = rate_prefixes.get(results_path)
+    before = data_version(results_path)
+
+    with run("refresh"):
+        mode = build(log_path, results_path)
+        version = data_version(results_path)
+        if mode == "append" and version != before:
+            # the whole-dataset cube is extended even when it was summed from month cubes; those
+            # stay keyed by their own file's version for date-range loads
+            extend_cube = cached is not None and cached[0] == before
+            extend_prefix = cached_prefix is not None and cached_prefix[0] == before
+            if extend_cube or extend_prefix:
+                rows = int(cached[1].counts.sum()) if extend_cube else int(cached_prefix[1].prefix[-1, 0])
+                new_rows = build_cube(read_results(results_path, start=rows))
+            if extend_cube:
+                cubes[results_path] = (version, merge_cubes(cached[1], new_rows))
+            if extend_prefix:
+                try:
+                    rate_prefixes[results_path] = (version, extend_rate_prefix(cached_prefix[1], new_rows))
+                except ValueError:
+                    # the new rows go back before the last day counted; they're recounted on next use
+                    pass
+
+        # the figure cache dropped everything for the old version; have the page figures ready
+        prewarm(results_path)
+
+    data_revision += 1
+
+
+def load_figures(results_path=None):
+    from scratch.figures import build_figures
+
+    results_path = results_file(results_path)
+    return build_figures(load_cube(results_path, data_version(results_path)))
+
+
+# rolling windows offered next to the rates graph, in days
+WINDOW_OPTIONS = [7, 14, 30, 60, 90]
+
+
+# cache params for the rates graph; the default windows share the page's entry
+def rate_params(windows=None):
+    from scratch.rates import RATE_WINDOWS
+
+    windows = sorted(windows or RATE_WINDOWS)
+    return () if windows == sorted(RATE_WINDOWS) else (tuple(windows),)
+
+
+# hashable form of the filter controls, None when nothing is filtered
+def filter_key(start_date=None, end_date=None, roles=None, results=None):
+    key = (start_date or None, end_date or None,
+           tuple(sorted(roles)) if roles else None,
+           tuple(sorted(results)) if results else None)
+    return key if any(key) else None
+
+
+# figure JSON from the cache, keyed by figure name, params, filters and data version
+def cached_figure(name, *params, filters=None, results_path=None):
+    results_path = results_file(results_path)
+    version = data_version(results_path)
+
+    def build():
+        from scratch.cube import filter_cube
+        from scratch.figures import FIGURE_BUILDERS
+
+        start, end = filters[:2] if filters is not None else (None, None)
+        if name in MANIFEST_FIGURES and not start and not end:
+            cube = summary_cube(results_path, version)
+        else:
+            cube = load_cube(results_path, version, start, end)
+        if filters is not None:
+            cube = filter_cube(cube, *filters)
+        if name == "rates_fig" and filters is None:
+            fig = FIGURE_BUILDERS[name](cube, *params, running=load_rate_prefix(results_path, version))
         else:
-            pie_cat_dff = dff[dff["Broad_Role"] == pie_category]
+            fig = FIGURE_BUILDERS[name](cube, *params)
+        with stage("to_json"):
+            if compact_payloads:
+                from scratch.payload import compact_json
 
-            pie_fig.add_trace(go.Pie(values=pie_cat_dff["Result"].value_counts(), 
-                    labels=pie_cat_dff["Result"].value_counts().index,
-                    scalegroup='one',
-                    marker=dict(colors=s.reindex(pie_cat_dff["Result"].value_counts().index)),
-                    hole=0.4,
-                    name=""), i, j) # donut
+                return compact_json(fig.to_json())
+            return fig.to_json()
+
+    return figure_cache.get_or_build((name, params, filters), version, build)
 
-        # update text labels on pie slices
-        pie_fig.update_traces(textinfo="value+percent", texttemplate="(%{value})<br>%{percent}")
 
-        i = i if j < 3 else 2
-        j = j + 1 if j < 3 else 1
+def role_categories(results_path=None):
+    from scratch.figures import sorted_role_group
 
-    pie_fig.update_layout(height=600, title_text='Overall Results of Applications', font=dict(size=10), plot_bgcolor=bg_color, paper_bgcolor=bg_color, margin=dict(b=0))
-    
-    #pie_fig = px.pie(dff, values=dff["Result"].value_counts(), names=dff["Result"].value_counts().index,
-    #                color=dff["Result"].value_counts().index,
-    #                color_discrete_map=result_colors)    
+    results_path = results_file(results_path)
+    return list(sorted_role_group(summary_cube(results_path, data_version(results_path))).index)
 
-    #pie_fig.update_layout(title=dict(text="Overall Applications", xanchor="center", x=0.5), font=dict(size=12))
 
-    return pie_fig
-    
-# dow
-def create_dow_fig(dff):       
-    dow_group = dff.groupby(["DOW", "Result"]).size().unstack() \
-                .sort_index(key=lambda d: d.map(DOW_dict)) \
-
-    dow_group["Total"] = dow_group.sum(axis=1)
-
-    dow_group = dow_group.reindex(dow_group.mean(axis=0) \
-                .sort_values(ascending=False).index, axis=1)
-
-    dow_fig = px.bar(dow_group,
-                barmode="group",
-                color_discrete_map=result_colors,
-                labels=dict(DOW="Day of Application", 
-                            value="# of Applications"),
-                title="Application Results by Day of the Week"
-                )   
-    
-    dow_fig.update_layout(plot_bgcolor=bg_color, paper_bgcolor=bg_color)
-    
-    return dow_fig
+# choices for the filter controls
+def filter_options(results_path=None):
+    import pandas as pd
+    from scratch.cube import result_counts
+    from scratch.storage import read_manifest, is_partitioned
 
-# month
-def create_month_fig(dff):
-    month_group = dff.groupby(["year_month", "Result"]).size().unstack()
+    results_path = results_file(results_path)
+    cube = summary_cube(results_path, data_version(results_path))
+    dates = (cube.dates.min(), cube.dates.max()) if len(cube.dates) else (None, None)
+    if is_partitioned(results_path):
+        partitions = sorted(read_manifest(results_path)["partitions"].values(), key=lambda partition: partition["first"])
+        # the manifest cube only has months, so the exact first and last days come from the manifest
+        dates = (pd.Timestamp(partitions[0]["first"]), pd.Timestamp(partitions[-1]["last"])) if partitions else (None, None)
 
-    month_group["Total"] = month_group.sum(axis=1)
+    return {"roles": role_categories(results_path),
+            "results": list(result_counts(cube).index),
+            "dates": dates}
 
-    month_group = month_group.reindex(month_group.mean(axis=0) \
-                  .sort_values(ascending=False).index, axis=1)
 
-    month_fig = px.bar(month_group,
-                barmode="group",
-                color_discrete_map=result_colors,
-                labels=dict(year_month="Month", 
-                            value="# of Applications"),
-                title="Application Results by Month"
-                )  
+# fill the cache with every page figure and the donut for every role category
+def prewarm(results_path=None):
+    from scratch.figures import PAGE_FIGURES
+
+    with run("prewarm"):
+        for name in PAGE_FIGURES:
+            cached_figure(name, results_path=results_path)
+        for pie_category in ["Overall"] + role_categories(results_path):
+            cached_figure("category_pie_fig", pie_category, results_path=results_path)
+
+
+# write figures to .html files, sharing one plotly.js bundle
+def export(results_path=None, out_dir="docs", compact=False, csv_path=None):
+    from scratch.export import export_figures
+    from scratch.storage import export_csv
+
+    with run("export", out=out_dir):
+        if csv_path:
+            with stage("export_csv"):
+                export_csv(results_file(results_path), csv_path)
+        figures = load_figures(results_path)
+        return export_figures([(fig, name) for name, fig in figures.items()], out_dir, compact=compact)
+
+
+def page_layout(results_path=None, live=False):
+    from scratch.figures import PAGE_FIGURES
+
+    with stage("page_layout"):
+        figures = {name: json.loads(cached_figure(name, results_path=results_path)) for name in PAGE_FIGURES}
+        return create_layout(figures, **filter_options(results_path), live=live, revision=data_revision)
 
-    month_fig.update_xaxes(
-    dtick="M1",
-    tickformat="%b %Y")  
-    
-    month_fig.update_layout(plot_bgcolor=bg_color, paper_bgcolor=bg_color)
-    
-    return month_fig
 
-# use background color from App.css
-bg_color = "#DDC3F8"
+def create_layout(figures, roles=(), results=(), dates=(None, None), live=False, revision=0):
+    from dash import html, dcc
+    from scratch.rates import RATE_WINDOWS
 
-external_stylesheets = ["docs/app.css"]
+    return html.Div(children=[
+        html.H1(children='Journey to an Entry-Level Job'),
 
-# figures
-role_fig, role_group = create_role_fig(df)
-time_series_fig = create_time_series_fig(df)
-month_fig = create_month_fig(df)
-dow_fig = create_dow_fig(df)
-pie_fig = create_pie_fig(df, role_group)
+        # the page polls for rebuilds of the log while the server watches it
+        dcc.Store(id='data-revision', data=revision),
+        dcc.Interval(id='live-poll', interval=LIVE_POLL_MS, disabled=not live),
 
-figs = ((role_fig, "role_fig"), 
-        (time_series_fig, "time_series_fig"), 
-        (month_fig, "month_fig"), 
-        (dow_fig, "dow_fig"), 
-        (pie_fig, "pie_fig"))
+        # filters for every figure on the page
+        html.Div(children=[
+            html.H4("""Filters"""),
 
-# for output
-output_static_figures = True
+            dcc.DatePickerRange(
+                id='date-range',
+                min_date_allowed=dates[0],
+                max_date_allowed=dates[1],
+                start_date_placeholder_text="First Application",
+                end_date_placeholder_text="Last Application",
+                clearable=True
+            ),
 
-# dash app
-app = Dash(__name__)
+            dcc.Dropdown(
+                list(roles),
+                None,
+                id='role-filter',
+                multi=True,
+                placeholder="All Roles"
+            ),
 
-app.title = "Journey to an Entry-Level Job"  
+            dcc.Dropdown(
+                list(results),
+                None,
+                id='result-filter',
+                multi=True,
+                placeholder="All Results"
+            ),
 
-app.layout = html.Div(children=[
-    html.H1(children='Journey to an Entry-Level Job'),
+        ], className="page-container", style={'width': '50%'}),
 
-    html.Div(children=[
-        html.H2("""Background"""),
+        html.Div(children=[
+            html.H2("""Background"""),
         
-        html.P("""I graduated with an M.S. in Data Science and Engineering in May of 2022, the same month that I started my internship as a Data Scientist at Cigna. In August I started to apply to jobs, attempting to land my first entry-level full-time job in the field, or related ones. Once my internship ended in September, I aimed to apply almost every day while working on my resume. To search for jobs, I used mainly LinkedIn, Indeed, Google, and SimplyHired."""),
+            html.P("""I graduated with an M.S. in Data Science and Engineering in May of 2022, the same month that I started my internship as a Data Scientist at Cigna. In August I started to apply to jobs, attempting to land my first entry-level full-time job in the field, or related ones. Once my internship ended in September, I aimed to apply almost every day while working on my resume. To search for jobs, I used mainly LinkedIn, Indeed, Google, and SimplyHired."""),
         
-        html.P(["""One thing is important to note: when I say "entry-level", I really mean a job that requires 0-1 years of prior experience, or a "new grad" position in other words. As I came to learn, "entry-level" usually requires 1-5 years of experience (based on listings from aggregators), and sometimes specifically excludes any internship or part-time experience. This isn't really """,
-              html.A("news", href="https://www.cbsnews.com/news/say-goodbye-to-the-entry-level-job/", 
-                     title="(pun intended)", 
-                     target="_blank",
-                     rel="noopener noreferrer",
-                     className="linkline"),
-              """ to any job seekers, but I figured I would mention its prevalence in my 2022 job search."""]),
+            html.P(["""One thing is important to note: when I say "entry-level", I really mean a job that requires 0-1 years of prior experience, or a "new grad" position in other words. As I came to learn, "entry-level" usually requires 1-5 years of experience (based on listings from aggregators), and sometimes specifically excludes any internship or part-time experience. This isn't really """,
+                  html.A("news", href="https://www.cbsnews.com/news/say-goodbye-to-the-entry-level-job/", 
+                         title="(pun intended)", 
+                         target="_blank",
+                         rel="noopener noreferrer",
+                         className="linkline"),
+                  """ to any job seekers, but I figured I would mention its prevalence in my 2022 job search."""]),
     
-    ], className="page-container"),
+        ], className="page-container"),
     
-    html.Div(children=[
-        html.H2("""Examining Applications over Time"""),
+        html.Div(children=[
+            html.H2("""Examining Applications over Time"""),
         
-        html.P("""The date range of applications I will look at is 08/09/2022 to 12/31/2022, during which I applied to 273 jobs. Before my internship ended on September 9th, I was applying to jobs and updating / reformatting my resume in order to bypass the ATS. It may or may not be a coincidence then that after the last resume update my applications began to result in interviews. Either way, August was an experimental period for the effectiveness of my applications and resume, apart from one of the applications made on August 12th which is an anomaly (more on that later). Interestingly, the date with the most applications (September 27th) resulted in no interviews, as well as the date with the second-most (August 31st). The first application(s) that resulted in interviews came after about 70 total applications. I tried to apply to at least one job per day, though there were stretches of time where I didn't apply daily, for one reason or another. This is mostly due to having exhausted the new listings on the job aggregators, which meant I could wait until more were posted each week."""),
+            html.P("""The date range of applications I will look at is 08/09/2022 to 12/31/2022, during which I applied to 273 jobs. Before my internship ended on September 9th, I was applying to jobs and updating / reformatting my resume in order to bypass the ATS. It may or may not be a coincidence then that after the last resume update my applications began to result in interviews. Either way, August was an experimental period for the effectiveness of my applications and resume, apart from one of the applications made on August 12th which is an anomaly (more on that later). Interestingly, the date with the most applications (September 27th) resulted in no interviews, as well as the date with the second-most (August 31st). The first application(s) that resulted in interviews came after about 70 total applications. I tried to apply to at least one job per day, though there were stretches of time where I didn't apply daily, for one reason or another. This is mostly due to having exhausted the new listings on the job aggregators, which meant I could wait until more were posted each week."""),
                 
-        dcc.Graph(
-            id='time-series',
-            figure=time_series_fig
-        )
+            dcc.Graph(
+                id='time-series',
+                figure=figures["time_series_fig"]
+            )
     
-    ], className="page-container"),
+        ], className="page-container"),
+
+        html.Div(children=[
+            html.H2("""Response Rates over Time"""),
+
+            html.P("""The daily counts above don't show how the applications from any stretch of time fared. The lines below are the share of applications sent in the trailing window that got any response, led to an interview, or were rejected, so a dip shows a period where applications went unanswered. Since the log only records when an application went out and its final result, the second graph shows how long the applications still without a response have been waiting."""),
+
+            html.Div(children=[
+                html.H4("""Rolling Window"""),
+
+                dcc.Dropdown(
+                    [{"label": f"{window} days", "value": window} for window in WINDOW_OPTIONS],
+                    RATE_WINDOWS,
+                    id='rate-windows',
+                    multi=True,
+                    placeholder="Default Windows"
+                ),
+
+            ], style={'width': '25%'}),
+
+            dcc.Graph(
+                id='rate-series',
+                figure=figures["rates_fig"]
+            ),
+
+            dcc.Graph(
+                id='waiting-time',
+                figure=figures["waiting_fig"]
+            )
+
+        ], className="page-container"),
     
-    html.Div(children=[
-        html.H2("""Examining Applications by Month"""),
+        html.Div(children=[
+            html.H2("""Examining Applications by Month"""),
         
-        html.P(""" This graph below is where the results of each application become visible and stratified. Looking more broadly at each month, there was at least one application per month which resulted in an interview. October and December both have the most applications at 67, and October has the most resulting interviews at 4. About half or more of each month's applications have no responses as of yet. Generally, August and December are slow months for hiring and recruiting, due to the summer and holiday season respectively, and the fall is generally a good time to apply for jobs."""),
+            html.P(""" This graph below is where the results of each application become visible and stratified. Looking more broadly at each month, there was at least one application per month which resulted in an interview. October and December both have the most applications at 67, and October has the most resulting interviews at 4. About half or more of each month's applications have no responses as of yet. Generally, August and December are slow months for hiring and recruiting, due to the summer and holiday season respectively, and the fall is generally a good time to apply for jobs."""),
         
-        # "error loading layout": plotly doesn't like Period type for time?
-        dcc.Graph(
-            id='month-groups',
-            figure=month_fig
-        )
-    ], className="page-container"),
+            # "error loading layout": plotly doesn't like Period type for time?
+            dcc.Graph(
+                id='month-groups',
+                figure=figures["month_fig"]
+            )
+        ], className="page-container"),
     
-    html.Div(children=[
-        html.H2("""Examining Applications by Days of the Week"""),
+        html.Div(children=[
+            html.H2("""Examining Applications by Days of the Week"""),
         
-         html.P("""This is more of a curiosity and behavioral analysis rather than anything to do with success rates of applications, as grouping my applications based on which day of the week I submitted them doesn't really provide too much insight into the process. I won't be superstitious from now on and never apply to a job on a Tuesday or Sunday (probably). It mainly shows that I applied more on weekdays, especially Tuesdays, Wednesdays, and Fridays, as well as the recurring statistic that over half of the applications each day of the week resulted in no response as of yet."""),
+             html.P("""This is more of a curiosity and behavioral analysis rather than anything to do with success rates of applications, as grouping my applications based on which day of the week I submitted them doesn't really provide too much insight into the process. I won't be superstitious from now on and never apply to a job on a Tuesday or Sunday (probably). It mainly shows that I applied more on weekdays, especially Tuesdays, Wednesdays, and Fridays, as well as the recurring statistic that over half of the applications each day of the week resulted in no response as of yet."""),
         
-        dcc.Graph(
-            id='dow-groups',
-            figure=dow_fig
-        ),
+            dcc.Graph(
+                id='dow-groups',
+                figure=figures["dow_fig"]
+            ),
         
        
-    ], className="page-container"),
+        ], className="page-container"),
     
-    html.Div(children=[
-        html.H2("""Examining Applications by Role"""),
+        html.Div(children=[
+            html.H2("""Examining Applications by Role"""),
 
-        html.P("""The graph below splits all 273 applications into broad categories describing the title of the role applied for. This was done very roughly by just matching substrings in the title that went along with each job listing, but should give a good idea of the results based on fields. As I mentioned above that I have a degree in data science and completed a data science internship, I mainly searched and applied for entry-level data science roles. However, as is evident from the graph, and as I have learned afterwards, new grad data scientist jobs don't really exist, and entry-level data scientist jobs require quite a bit of experience (as they probably should). Thus, the way to break into the field is to go for a data analyst or data engineering position first. This is reflected in the data, since most of the interviews I have had (or have been contacted for) were for data analyst positions."""),
+            html.P("""The graph below splits all 273 applications into broad categories describing the title of the role applied for. This was done very roughly by just matching substrings in the title that went along with each job listing, but should give a good idea of the results based on fields. As I mentioned above that I have a degree in data science and completed a data science internship, I mainly searched and applied for entry-level data science roles. However, as is evident from the graph, and as I have learned afterwards, new grad data scientist jobs don't really exist, and entry-level data scientist jobs require quite a bit of experience (as they probably should). Thus, the way to break into the field is to go for a data analyst or data engineering position first. This is reflected in the data, since most of the interviews I have had (or have been contacted for) were for data analyst positions."""),
         
-        dcc.Graph(
-            id='role-groups',
-            figure=role_fig
-        )
+            dcc.Graph(
+                id='role-groups',
+                figure=figures["role_fig"]
+            )
         
-    ], className="page-container"),
+        ], className="page-container"),
     
-    html.Div(children=[
-        html.H2("""Overall Results of Applications"""),
+        html.Div(children=[
+            html.H2("""Overall Results of Applications"""),
         
-        html.P("""This final graph shows the results of all applications in donut chart form, and is also split by roles to give a different perspective of the above graph. Here we can make sense of the percentages that were evident in the grouped bar charts, as 61.9% of all applications resulted in no response, while 31.5% resulted in rejections. Disregarding application responses that were scams, just about 5.1% of all applications resulted in being contacted by someone from a company for a reason other than a rejection. This seems to line up with expectations, as I've seen many posts mentioning sending anywhere from 100 to 500 applications before actually securing a role. I can imagine it being more saturated in other computer science adjacent fields like software development or web development than in data analysis and data science."""),
+            html.P("""This final graph shows the results of all applications in donut chart form, and is also split by roles to give a different perspective of the above graph. Here we can make sense of the percentages that were evident in the grouped bar charts, as 61.9% of all applications resulted in no response, while 31.5% resulted in rejections. Disregarding application responses that were scams, just about 5.1% of all applications resulted in being contacted by someone from a company for a reason other than a rejection. This seems to line up with expectations, as I've seen many posts mentioning sending anywhere from 100 to 500 applications before actually securing a role. I can imagine it being more saturated in other computer science adjacent fields like software development or web development than in data analysis and data science."""),
         
         
-        #html.Div(children=[
-        #    html.H4("""Role Category Dropdown"""),
-
-            #dcc.Dropdown(
-            #    ["Overall"] + list(role_group.index),
-            #    'Overall',
-            #    id='pie-cats'
-            #),
+            html.Div(children=[
+                html.H4("""Role Category Dropdown"""),
+
+                # cleared dropdown shows every category at once
+                dcc.Dropdown(
+                    ["Overall"] + list(roles),
+                    None,
+                    id='pie-cats',
+                    placeholder="All Categories"
+                ),
                         
-        #], style={'width': '25%'}),
+            ], style={'width': '25%'}),
         
-        dcc.Graph(
-            id='results-pie',
-            figure=pie_fig
-        )
+            dcc.Graph(
+                id='results-pie',
+                figure=figures["pie_fig"]
+            )
         
-    ], className="page-container"),
+        ], className="page-container"),
         
-    html.Div(children=[
-        html.H2("""In Conclusion..."""),
+        html.Div(children=[
+            html.H2("""In Conclusion..."""),
         
-        html.P("""I got one offer out of the 273 applications, which was the anomaly I mentioned before. This application was one of the two internal applications I made during my internship. The original name for this role was "Data Analyst Lead", but changed to "Junior Data Engineer" months later. Despite sending this application in early August, I was contacted by the recruiter in mid-November. It may seem like the rest of my applications were futile if the 16th one I sent eventually led to an offer, but all the interviews I had before November prepared me for the three I had for this role."""),
+            html.P("""I got one offer out of the 273 applications, which was the anomaly I mentioned before. This application was one of the two internal applications I made during my internship. The original name for this role was "Data Analyst Lead", but changed to "Junior Data Engineer" months later. Despite sending this application in early August, I was contacted by the recruiter in mid-November. It may seem like the rest of my applications were futile if the 16th one I sent eventually led to an offer, but all the interviews I had before November prepared me for the three I had for this role."""),
         
-        html.H3("Takeaways"),
+            html.H3("Takeaways"),
         
-        html.Ul(children=[
+            html.Ul(children=[
         
-            html.Li([
+                html.Li([
                 
-                html.B("Internships"),
+                    html.B("Internships"),
                 
-                html.P("""With the death of the entry-level job came the rise of the internship, and its importance cannot be overstated. A minimum of one internship is crucial for gaining experience, and the fact that companies like to hire prior employees makes it even more important. Make sure to internally apply during an internship if you can.""")
-            ]),
+                    html.P("""With the death of the entry-level job came the rise of the internship, and its importance cannot be overstated. A minimum of one internship is crucial for gaining experience, and the fact that companies like to hire prior employees makes it even more important. Make sure to internally apply during an internship if you can.""")
+                ]),
             
-            html.Li([
-                html.B("Response Rates"),
+                html.Li([
+                    html.B("Response Rates"),
                 
-                html.P("""This will most likely differ depending on how much experience you have, but if you had < 1 year like me, expect no responses to at least half of all of your applications. Applicant tracking systems (ATS) automate the hiring process quite a bit, so you'd think companies would have some sort of auto-rejection set up once your resume gets filtered on the first pass, but this doesn't seem to be the case.""")
-            ]),
+                    html.P("""This will most likely differ depending on how much experience you have, but if you had < 1 year like me, expect no responses to at least half of all of your applications. Applicant tracking systems (ATS) automate the hiring process quite a bit, so you'd think companies would have some sort of auto-rejection set up once your resume gets filtered on the first pass, but this doesn't seem to be the case.""")
+                ]),
             
-            html.Li([
-                html.B("Job Aggregators"),
+                html.Li([
+                    html.B("Job Aggregators"),
                 
-                html.Br(),
+                    html.Br(),
                 
-                html.P("""Some postings on LinkedIn and Indeed already do this, but if you see a job posting that you're really eager to apply to, try to find the listing on the company site's careers page and apply there instead. That way, you can be sure that your application went directly to the company's hiring team. This is also a good way to make sure you aren't being scammed by a fraudulent posting.""")
-            ])
+                    html.P("""Some postings on LinkedIn and Indeed already do this, but if you see a job posting that you're really eager to apply to, try to find the listing on the company site's careers page and apply there instead. That way, you can be sure that your application went directly to the company's hiring team. This is also a good way to make sure you aren't being scammed by a fraudulent posting.""")
+                ])
             
-        ]),
+            ]),
         
         
-        html.P("""In the end, this is a small sample size of only one tech employment field, so these results should not be taken too seriously, but I think they give a good example of the job search process for a recent graduate in 2022.""")
+            html.P("""In the end, this is a small sample size of only one tech employment field, so these results should not be taken too seriously, but I think they give a good example of the job search process for a recent graduate in 2022.""")
         
-    ], className="page-container")
-])
-
-# callback decorator
-# callback not available for static page
-#@app.callback(
-#    Output('results-pie', 'figure'),
-#    Input('pie-cats', 'value'))
-#def update_pie(pie_category):   
-#    pie_category = pie_category if pie_category is not None else "Overall"
-#    
-#    # default to overall if clearing the dropdown
-#    if pie_category == "Overall":
-#        fig = px.pie(df, values=df["Result"].value_counts(), names=df["Result"].value_counts().index,
-#                color=df["Result"].value_counts().index,
-#                color_discrete_map=result_colors,
-#                hole=0.4) # donut
-#    else:
-#        pie_cat_df = df[df["Broad_Role"] == pie_category]
-#    
-#        fig = px.pie(pie_cat_df, values=pie_cat_df["Result"].value_counts(), names=pie_cat_df["Result"].value_counts().index,
-#                color=pie_cat_df["Result"].value_counts().index,
-#                color_discrete_map=result_colors,
-#                hole=0.4) # donut
-#    
-#    # update text labels on pie slices
-#    fig.update_traces(textinfo="value+percent", texttemplate="(%{value})<br>%{percent}")
-#    
-#    # update title
-#    fig.update_layout(title=dict(text=f"{pie_category} Applications", xanchor="center", x=0.5), font=dict(size=12))
-#    
-#    return fig
-
-# write figures to .html files
-if output_static_figures:
-    for fig, name in figs:
-        fig.write_html("docs\\" + name + ".html")
-
-#if __name__ == '__main__':
-#    app.run_server()
\ No newline at end of file
+        ], className="page-container")
+    ])
+
+
+# gzip/brotli for callback and layout JSON and the Dash bundles, when the browser takes it
+def compress_response(response):
+    from flask import request
+    from scratch.payload import accepted_codings, compress, encodings
+
+    if response.status_code != 200 or "Content-Encoding" in response.headers or response.mimetype not in (
+            "application/json", "text/html", "application/javascript", "text/javascript", "text/css"):
+        return response
+
+    accepted = accepted_codings(request.headers.get("Accept-Encoding"))
+    coding = next((coding for coding, _ in encodings() if coding in accepted), None)
+    if coding is None:
+        return response
+
+    # Dash's component bundles are compressed once at the best setting and kept
+    bundle = request.path.startswith("/_dash-component-suites/")
+    if bundle and (request.path, coding) in compressed_assets:
+        body = compressed_assets[(request.path, coding)]
+    else:
+        response.direct_passthrough = False
+        content = response.get_data()
+        if len(content) < 1024:
+            return response
+        body = compress(content, coding, fast=not bundle)
+        if bundle:
+            compressed_assets[(request.path, coding)] = body
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = coding
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+# dash app; live pages redraw when the log watcher rebuilds the results
+def create_app(results_path=None, live=False, docs_dir="docs"):
+    from dash import Dash, Input, Output, State, ctx, no_update
+
+    from scratch import query
+
+    # picks up DASHJOURNEY_PROFILE / DASHJOURNEY_TRACE_MEMORY under a WSGI server
+    configure()
+    # and fails at startup when DASHJOURNEY_BACKEND can't run here
+    query.configure()
+
+    app = Dash(__name__)
+
+    app.title = "Journey to an Entry-Level Job"  
+
+    # figures are built on the first page load rather than at startup, so
+    # callbacks are validated against a copy of the layout with empty figures
+    app.validation_layout = create_layout(defaultdict(dict))
+    app.layout = lambda: page_layout(results_path, live)
+
+    # a new revision in the store is what redraws the figures below
+    @app.callback(
+        Output('data-revision', 'data'),
+        Input('live-poll', 'n_intervals'),
+        State('data-revision', 'data'),
+        prevent_initial_call=True)
+    def poll_revision(n_intervals, seen):
+        return data_revision if data_revision != seen else no_update
+
+    # callback decorator
+    @app.callback(
+        [Output(graph_id, 'figure') for graph_id in FILTERED_GRAPHS] +
+        [Output('rate-series', 'figure'), Output('results-pie', 'figure')],
+        Input('date-range', 'start_date'),
+        Input('date-range', 'end_date'),
+        Input('role-filter', 'value'),
+        Input('result-filter', 'value'),
+        Input('rate-windows', 'value'),
+        Input('pie-cats', 'value'),
+        Input('data-revision', 'data'))
+    def update_figures(start_date, end_date, roles, results, windows, pie_category, revision):
+        with stage("callback.update_figures"):
+            return filtered_figures(start_date, end_date, roles, results, windows, pie_category)
+
+    def filtered_figures(start_date, end_date, roles, results, windows, pie_category):
+        filters = filter_key(start_date, end_date, roles, results)
+
+        # each dropdown only changes its own graph
+        figures = [no_update] * len(FILTERED_GRAPHS)
+        if ctx.triggered_id not in ('pie-cats', 'rate-windows'):
+            figures = [json.loads(cached_figure(name, filters=filters, results_path=results_path))
+                       for name in FILTERED_GRAPHS.values()]
+
+        rates_fig = no_update
+        if ctx.triggered_id != 'pie-cats':
+            rates_fig = json.loads(cached_figure("rates_fig", *rate_params(windows), filters=filters, results_path=results_path))
+
+        pie_fig = no_update
+        if ctx.triggered_id != 'rate-windows':
+            if pie_category is None:
+                pie_fig = cached_figure("pie_fig", filters=filters, results_path=results_path)
+            else:
+                pie_fig = cached_figure("category_pie_fig", pie_category, filters=filters, results_path=results_path)
+            pie_fig = json.loads(pie_fig)
+
+        return figures + [rates_fig, pie_fig]
+
+    # exported pages, sent as their precompressed variant when the browser takes it
+    @app.server.route("/docs/<path:name>")
+    def docs_file(name):
+        import mimetypes
+        import os
+        from flask import abort, request, send_file
+        from werkzeug.utils import safe_join
+        from scratch.payload import pick_variant
+
+        path = safe_join(docs_dir, name)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        variant, coding = pick_variant(path, request.headers.get("Accept-Encoding"))
+        response = send_file(variant, mimetype=mimetypes.guess_type(path)[0], conditional=True, etag=True)
+        if coding is not None:
+            response.headers["Content-Encoding"] = coding
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    if compact_payloads:
+        app.server.after_request(compress_response)
+
+    # stage latency histograms for a local Prometheus scrape
+    @app.server.route("/metrics")
+    def metrics_endpoint():
+        from flask import Response, abort, request
+
+        if request.remote_addr not in ("127.0.0.1", "::1"):
+            abort(404)
+        cache = [("dashjourney_figure_cache_hits_total", "counter", figure_cache.hits),
+                 ("dashjourney_figure_cache_misses_total", "counter", figure_cache.misses),
+                 ("dashjourney_figure_cache_entries", "gauge", len(figure_cache.entries))]
+        return Response(metrics.render(cache), mimetype="text/plain; version=0.0.4")
+
+    return app
+
+
+def serve(results_path=None, host="127.0.0.1", port=8050, debug=False, warm=False, watch=False, log_path=None, debounce=1.0,
+          compact=False):
+    import os
+    global compact_payloads
+
+    compact_payloads = compact
+    app = create_app(results_path, live=watch)
+    if warm:
+        prewarm(results_path)
+
+    # with the debug reloader only the child process serving requests watches
+    if watch and (not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true"):
+        from scratch.create_dataframe import LOG_PATH
+        from scratch.watcher import LogWatcher
+
+        LogWatcher(log_path or LOG_PATH, lambda: refresh(log_path, results_path), debounce=debounce).start()
+
+    app.run(host=host, port=port, debug=debug)
+
+
+_app = None
+
+
+# `app` and `server` for WSGI servers (e.g. gunicorn app:server), created on first access
+def __getattr__(name):
+    global _app
+    if name in ("app", "server"):
+        if _app is None:
+            _app = create_app()
+        return _app if name == "app" else _app.server
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Journey to an Entry-Level Job dashboard")
+    parser.add_argument("--log", help="application log to parse")
+    parser.add_argument("--results", help="results directory, one Arrow file per month (the default), "
+                                          "or a single .arrow/.feather/.csv file")
+    parser.add_argument("--profile", metavar="DIR", help="write a cProfile dump per stage to DIR")
+    parser.add_argument("--trace-memory", action="store_true", help="track peak memory per stage (slower)")
+    parser.add_argument("--backend", choices=["auto", "duckdb", "pandas"],
+                        help="engine that aggregates the results (default: duckdb if installed, else pandas)")
+    stages = parser.add_subparsers(dest="stage")
+
+    stages.add_parser("build", help="update the results from the application log")
+
+    export_parser = stages.add_parser("export", help="write the static figure pages")
+    export_parser.add_argument("--out", default="docs")
+    export_parser.add_argument("--compact", action="store_true", help="compact figure JSON and write .gz/.br variants")
+    export_parser.add_argument("--csv", metavar="PATH", help="also write the results table to PATH as csv")
+
+    serve_parser = stages.add_parser("serve", help="run the Dash server")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8050)
+    serve_parser.add_argument("--debug", action="store_true")
+    serve_parser.add_argument("--prewarm", action="store_true", help="build every figure before taking requests")
+    serve_parser.add_argument("--watch", action="store_true", help="rebuild when the log changes and update open pages")
+    serve_parser.add_argument("--debounce", type=float, default=1.0, help="seconds the log must be quiet before a rebuild")
+    serve_parser.add_argument("--compact", action="store_true", help="compact figure JSON and compress responses")
+
+    batch_parser = stages.add_parser("batch", help="build results and figures for many logs in parallel")
+    batch_parser.add_argument("source", help="directory of .txt logs, or a CSV manifest with user,log columns")
+    batch_parser.add_argument("--out", default="batch")
+    batch_parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+
+    args = parser.parse_args(argv)
+    if args.results:
+        from scratch.storage import check_results_path
+
+        try:
+            check_results_path(args.results)
+        except ValueError as e:
+            parser.error(str(e))
+
+    import logging
+    from scratch import query
+
+    # one JSON line per run on stderr
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    configure(args.profile, args.trace_memory)
+    try:
+        query.configure(args.backend)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # no stage: rebuild the results and the static pages, as app.py always did
+    if args.stage in (None, "build"):
+        build(args.log, args.results)
+    if args.stage in (None, "export"):
+        export(args.results, getattr(args, "out", "docs"), getattr(args, "compact", False), getattr(args, "csv", None))
+    if args.stage == "serve":
+        serve(args.results, args.host, args.port, args.debug, args.prewarm, args.watch, args.log, args.debounce,
+              args.compact)
+    if args.stage == "batch":
+        from scratch.batch import run_batch
+
+        with run("batch", source=args.source):
+            run_batch(args.source, args.out, args.workers)
+
+
+if __name__ == '__main__':
+    main()
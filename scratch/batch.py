@@ -0,0 +1,110 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import csv
+import logging
+import os
+import time
+
+from scratch.create_dataframe import create_dataframe
+from scratch.storage import read_results, write_results
+from scratch.cube import empty_cube, build_cube, merge_cubes, cube_to_frame
+from scratch.export import write_plotlyjs, PLOTLYJS_NAME
+from scratch.metrics import run
+
+
+# (user, log path) pairs from a directory of *.txt logs or a user,log manifest CSV
+def find_logs(source):
+    if os.path.isdir(source):
+        return [(os.path.splitext(name)[0], os.path.join(source, name))
+                for name in sorted(os.listdir(source)) if name.endswith(".txt")]
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, "r", encoding="utf-8", newline="") as file:
+        return [(row["user"], os.path.join(base, row["log"])) for row in csv.DictReader(file)]
+
+
+# one user's log start to finish; runs in a worker process and only sends the cube back
+def process_log(user, log_path, out_dir):
+    from scratch.figures import build_figures
+    from scratch.export import export_figures
+
+    # spawned workers don't inherit the parent's logging setup
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    start = time.perf_counter()
+    user_dir = os.path.join(out_dir, "users", user)
+    os.makedirs(user_dir, exist_ok=True)
+
+    results_path = os.path.join(user_dir, "results.arrow")
+    with run("batch_log", user=user):
+        create_dataframe(log_path, results_path, incremental=True)
+        cube = build_cube(read_results(results_path))
+
+        # an empty log (or one with no date headers) has nothing to draw
+        if len(cube.dates):
+            # pages share the bundle at the top of out_dir
+            figures = build_figures(cube)
+            export_figures([(fig, name) for name, fig in figures.items()], os.path.join(user_dir, "docs"),
+                           max_workers=1, verbose=False, plotlyjs_src="../../../" + PLOTLYJS_NAME)
+
+    return user, cube, int(cube.counts.sum()), time.perf_counter() - start
+
+
+def run_batch(source, out_dir, max_workers=None, verbose=True):
+    from scratch.figures import build_figures
+    from scratch.export import export_figures
+
+    logs = find_logs(source)
+    os.makedirs(out_dir, exist_ok=True)
+    write_plotlyjs(out_dir)
+
+    start = time.perf_counter()
+    max_workers = max_workers or os.cpu_count() or 1
+    combined = empty_cube()
+    report = []
+
+    # keep only a couple of logs per worker in flight, and fold each cube in as it lands;
+    # a log that fails is reported and the rest of the batch carries on
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        queue = iter(logs)
+        running = {}
+        while True:
+            for user, log_path in queue:
+                running[pool.submit(process_log, user, log_path, out_dir)] = (user, log_path)
+                if len(running) >= 2 * max_workers:
+                    break
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                user, log_path = running.pop(future)
+                try:
+                    user, cube, rows, seconds = future.result()
+                except Exception as e:
+                    logging.getLogger("dashjourney").error(f"batch log {log_path} for {user} failed", exc_info=e)
+                    report.append({"user": user, "rows": 0, "seconds": None, "error": repr(e)})
+                    if verbose:
+                        print(f"{user:>24}: failed, {e!r}")
+                    continue
+
+                combined = merge_cubes(combined, cube)
+                report.append({"user": user, "rows": rows, "seconds": seconds})
+                if verbose:
+                    print(f"{user:>24}: {rows:10,} applications  {seconds:7.3f} s" + ("  (nothing to draw)" if not rows else ""))
+
+    # cross-user aggregate: the summed cube as a table, plus the usual figures over it
+    combined_dir = os.path.join(out_dir, "combined")
+    os.makedirs(combined_dir, exist_ok=True)
+    if len(combined.dates):
+        write_results(cube_to_frame(combined), os.path.join(combined_dir, "counts.arrow"))
+        figures = build_figures(combined)
+        export_figures([(fig, name) for name, fig in figures.items()], os.path.join(combined_dir, "docs"),
+                       verbose=False, plotlyjs_src="../../" + PLOTLYJS_NAME)
+
+    if verbose:
+        total = sum(row["rows"] for row in report)
+        failed = sum("error" in row for row in report)
+        print(f"{len(report)} logs, {total:,} applications in {time.perf_counter() - start:.3f} s" +
+              (f", {failed} failed" if failed else ""))
+
+    return combined, report
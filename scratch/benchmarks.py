@@ -0,0 +1,587 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from scratch.create_dataframe import iter_log_blocks, parse_blocks, records_to_frame, classify_roles, create_dataframe
+from scratch.generate_log import write_synthetic_log, synthetic_titles, synthetic_results
+from scratch.storage import write_results, append_results, read_results, read_manifest, apply_schema
+from scratch.cube import build_cube, filter_cube, daily_counts, role_counts, dow_counts, month_counts, result_counts, result_dates
+from scratch.figures import add_daily_counts, add_event_markers
+from scratch.rates import rate_prefix, extend_rate_prefix, rolling_rates
+
+
+def timed(func, *args, repeat=3, **kwargs):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+# parser used by create_dataframe() before the streaming rewrite, kept for comparison
+def legacy_parse(path):
+    from dateutil.parser import parse
+
+    with open(path, "r", encoding="utf-8") as file:
+        text = file.readlines()
+
+    date_dict = {}
+
+    for line in text:
+        try:
+            date = parse(line)
+            date_dict[date] = []
+        except:
+            if ":" in line:
+                date_dict[date].append(line)
+
+    jobs_by_date = [item for sublist in [list(map(lambda vv: (k, vv), v)) for k, v in date_dict.items()] for item in sublist]
+
+    df = pd.DataFrame(jobs_by_date, columns=["Date_Applied", "Line"])
+    df["Company"] = df["Line"].str.strip().str.split(":").apply(lambda l: l[0].strip())
+    df["Title"] = df["Line"].str.strip().str.split(r":|w.+\$$|==>", regex=True).apply(lambda l: l[1].strip().title())
+    df["Result"] = df["Line"].str.strip().str.split("==>").apply(lambda l: l[1].strip().title() if len(l) > 1 else "No Response")
+    df["DOW"] = df["Date_Applied"].apply(lambda d: d.day_name())
+    df["year_month"] = df["Date_Applied"].dt.to_period("M").astype(str)
+
+    return df
+
+
+# what create_dataframe's parse stage runs, block splitting and hashing for the checkpoint included
+def streaming_parse(path):
+    return records_to_frame(parse_blocks(iter_log_blocks(path), []))
+
+
+def bench_parse(n_lines=1_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "log.txt")
+        write_synthetic_log(path, n_lines)
+
+        legacy_time, legacy_df = timed(legacy_parse, path, repeat=1)
+        streaming_time, streaming_df = timed(streaming_parse, path)
+
+    # the legacy parser kept the time from headers like "8/9/2022 10:30", the streaming one keeps the day
+    legacy_df["Date_Applied"] = legacy_df["Date_Applied"].dt.normalize()
+    assert len(legacy_df) == len(streaming_df)
+    for column in ["Date_Applied", "Company", "Title", "Result", "DOW", "year_month"]:
+        assert (legacy_df[column].values == streaming_df[column].values).all(), column
+
+    print(f"parse {n_lines:,} lines ({len(streaming_df):,} applications)")
+    print(f"  legacy:    {legacy_time:8.3f} s")
+    print(f"  streaming: {streaming_time:8.3f} s  ({legacy_time / streaming_time:.1f}x)")
+
+
+# Broad_Role assignment used by create_dataframe() before the single-regex classifier
+def legacy_classify_roles(df_title):
+    dse_match = "(?i)Data Scientist|Data Science|Science|Scientist"
+    da_match = "(?i)Data Analyst|Data Analytics|Analytics|Analyst"
+    ml_match = "(?i)Machine Learning Engineer|Machine Learning"
+    de_match = "(?i)Data Engineer|Engineer|Engineering|Database"
+
+    dse_series = df_title[df_title.str.contains(dse_match)]
+
+    ml_series = df_title[df_title.str.contains(ml_match)]
+    de_series = df_title[df_title.str.contains(de_match)]
+    de_series = de_series[(~de_series.isin(ml_series)) & (~de_series.isin(dse_series))]
+
+    da_series = df_title[df_title.str.contains(da_match)]
+    da_series = da_series[(~da_series.isin(dse_series)) & (~da_series.isin(de_series)) & (~da_series.isin(ml_series))]
+
+    other_series = df_title[~((df_title.str.contains(dse_match)) | (df_title.str.contains(da_match)) | (df_title.str.contains(ml_match)) | (df_title.str.contains(de_match)))]
+
+    return pd.Series("Data Scientist", dse_series.index).combine_first(pd.Series("Data Analyst", da_series.index)) \
+        .combine_first(pd.Series("Data Engineer", de_series.index)) \
+        .combine_first(pd.Series("ML Engineer", ml_series.index)) \
+        .combine_first(pd.Series("Other", other_series.index))
+
+
+def bench_classify(n_titles=1_000_000):
+    titles = pd.Series(synthetic_titles(n_titles))
+
+    legacy_time, legacy_roles = timed(legacy_classify_roles, titles, repeat=1)
+    vectorized_time, roles = timed(classify_roles, titles)
+
+    assert (legacy_roles.sort_index().values == roles.astype(str).values).all()
+
+    print(f"classify {n_titles:,} titles ({titles.nunique():,} distinct)")
+    print(f"  legacy:     {legacy_time:8.3f} s")
+    print(f"  vectorized: {vectorized_time:8.3f} s  ({legacy_time / vectorized_time:.1f}x)")
+
+
+def bench_incremental(n_lines=1_000_000, n_new=1_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        full_path = os.path.join(tmp, "full.txt")
+        log_path = os.path.join(tmp, "log.txt")
+        output_path = os.path.join(tmp, "results.csv")
+        write_synthetic_log(full_path, n_lines + n_new)
+
+        with open(full_path, "r", encoding="utf-8") as file:
+            lines = file.readlines()
+        with open(log_path, "w", encoding="utf-8") as file:
+            file.writelines(lines[:n_lines])
+
+        full_time, _ = timed(create_dataframe, log_path, output_path, repeat=1)
+
+        with open(log_path, "a", encoding="utf-8") as file:
+            file.writelines(lines[n_lines:])
+        append_time, _ = timed(create_dataframe, log_path, output_path, repeat=1, incremental=True)
+
+    print(f"ingest {n_lines:,} lines, then {n_new:,} appended lines")
+    print(f"  full rebuild:     {full_time:8.3f} s")
+    print(f"  incremental tail: {append_time:8.3f} s")
+
+
+def frame_memory(df):
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+def bench_storage(n_rows=1_000_000):
+    df = synthetic_results(n_rows)
+
+    def load_csv(path):
+        # what app.py did before the columnar store
+        dff = pd.read_csv(path, index_col=0)
+        dff["Date_Applied"] = pd.to_datetime(dff["Date_Applied"])
+        return dff
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "results.csv")
+        arrow_path = os.path.join(tmp, "results.arrow")
+
+        df.to_csv(csv_path)
+        write_results(df, arrow_path)
+
+        csv_time, csv_df = timed(load_csv, csv_path)
+        arrow_time, arrow_df = timed(read_results, arrow_path)
+        subset_time, _ = timed(read_results, arrow_path, ["Date_Applied", "Result"])
+
+        csv_size = os.path.getsize(csv_path) / 2**20
+        arrow_size = os.path.getsize(arrow_path) / 2**20
+
+    print(f"load {n_rows:,} result rows")
+    print(f"  csv:            {csv_time:8.3f} s  {csv_size:7.1f} MB on disk  {frame_memory(csv_df):7.1f} MB in memory")
+    print(f"  arrow:          {arrow_time:8.3f} s  {arrow_size:7.1f} MB on disk  {frame_memory(arrow_df):7.1f} MB in memory")
+    print(f"  arrow, 2 cols:  {subset_time:8.3f} s")
+
+
+# the grouping each figure builder in app.py did on the raw frame before the count cube
+def legacy_aggregates(df):
+    role_group = df.groupby(["Broad_Role", "Result"], observed=True).size().unstack()
+    dow_group = df.groupby(["DOW", "Result"], observed=True).size().unstack()
+    month_group = df.groupby(["year_month", "Result"], observed=True).size().unstack()
+    date_count = df.groupby("Date_Applied").size().reindex(pd.date_range(df["Date_Applied"].min(), df["Date_Applied"].max()), fill_value=0)
+    interview_dates = df["Date_Applied"][df["Result"].str.contains("(?i)Interview")].values
+    offer_dates = df["Date_Applied"][df["Result"].str.contains("Offer")].values
+
+    pies = [df["Result"].value_counts() for _ in range(3)]
+    for role in role_group.index:
+        pie_cat_df = df[df["Broad_Role"] == role]
+        pies += [pie_cat_df["Result"].value_counts() for _ in range(3)]
+
+    return role_group, dow_group, month_group, date_count, interview_dates, offer_dates, pies
+
+
+def cube_aggregates(df):
+    return aggregates_from_cube(build_cube(df))
+
+
+def aggregates_from_cube(cube):
+    pies = [result_counts(cube)] + [result_counts(cube, role) for role in cube.roles]
+    return role_counts(cube), dow_counts(cube), month_counts(cube), daily_counts(cube), \
+        result_dates(cube, "(?i)Interview"), result_dates(cube, "Offer"), pies
+
+
+def bench_aggregates(n_rows=1_000_000):
+    df = apply_schema(synthetic_results(n_rows))
+
+    legacy_time, _ = timed(legacy_aggregates, df)
+    cube_time, _ = timed(cube_aggregates, df)
+
+    print(f"figure aggregates over {n_rows:,} rows")
+    print(f"  per-figure groupby: {legacy_time:8.3f} s")
+    print(f"  count cube:         {cube_time:8.3f} s  ({legacy_time / cube_time:.1f}x)")
+
+
+def synthetic_date_count(n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series(rng.poisson(3, n_days), index=pd.date_range("2022-08-09", periods=n_days))
+
+
+# time series as app.py drew it before batching: one trace per event
+def legacy_time_series_fig(date_count, event_dates):
+    from plotly.subplots import make_subplots
+    import plotly.graph_objects as go
+
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_bar(x=date_count.index, y=date_count.values, name="Daily Count", secondary_y=False)
+    fig.add_scatter(x=date_count.cumsum().index, y=date_count.cumsum().values, name="Cumulative Count", fillcolor="orange", secondary_y=True)
+
+    for i, x in enumerate(event_dates):
+        fig.add_trace(go.Scatter(x=[str(x), str(x)],
+                                 y=[date_count.min(), date_count.max()+1],
+                                 mode="lines",
+                                 line=dict(color="green", width=1, dash="dashdot"),
+                                 name="Application(s) Led to Interview",
+                                 legendgroup="Application(s) Led to Interview",
+                                 showlegend=False if i > 0 else True))
+    return fig
+
+
+def batched_time_series_fig(date_count, event_dates):
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    bar_count = add_daily_counts(fig, date_count)
+    add_event_markers(fig, event_dates, [bar_count.min(), bar_count.max()+1],
+                      name="Application(s) Led to Interview",
+                      line=dict(color="green", width=1, dash="dashdot"))
+    return fig
+
+
+def bench_time_series(n_days=3_650):
+    date_count = synthetic_date_count(n_days)
+
+    print(f"time series over {n_days:,} days")
+    print(f"  {'events':>7}  {'legacy s':>9}  {'legacy KB':>10}  {'batched s':>9}  {'batched KB':>10}")
+    for n_events in [10, 100, 1_000, 3_000]:
+        event_dates = date_count.index[:n_events].strftime("%Y-%m-%d")
+
+        legacy_time, legacy_fig = timed(legacy_time_series_fig, date_count, event_dates, repeat=1)
+        batched_time, batched_fig = timed(batched_time_series_fig, date_count, event_dates)
+
+        legacy_size = len(legacy_fig.to_json()) / 1024
+        batched_size = len(batched_fig.to_json()) / 1024
+        print(f"  {n_events:>7,}  {legacy_time:9.3f}  {legacy_size:10.1f}  {batched_time:9.3f}  {batched_size:10.1f}")
+
+
+def bench_import(repeat=5):
+    # fresh interpreter each time, so nothing is already in sys.modules
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)"
+
+    times = [float(subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True).stdout)
+             for _ in range(repeat)]
+
+    print(f"cold 'import app', best of {repeat}: {min(times) * 1000:8.1f} ms")
+
+
+def bench_figure_cache(n_rows=1_000_000, repeat=1_000):
+    import app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results_path = os.path.join(tmp, "results.arrow")
+        write_results(synthetic_results(n_rows), results_path)
+
+        roles = app.role_categories(results_path)
+        start = time.perf_counter()
+        app.prewarm(results_path)
+        prewarm_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for role in roles:
+                app.cached_figure("category_pie_fig", role, results_path=results_path)
+        hit_time = (time.perf_counter() - start) / (repeat * len(roles))
+
+    print(f"figure cache over {n_rows:,} rows")
+    print(f"  prewarm ({len(app.figure_cache.entries)} figures): {prewarm_time:8.3f} s")
+    print(f"  cached pie:                {hit_time * 1e6:8.1f} us")
+
+
+# filtering the raw frame with boolean masks, then counting what's left
+def masked_cube(df, start, end, roles, results):
+    mask = (df["Date_Applied"] >= start) & (df["Date_Applied"] <= end) & \
+        df["Broad_Role"].isin(roles) & df["Result"].isin(results)
+    return build_cube(df[mask])
+
+
+def bench_cross_filter(sizes=(100_000, 1_000_000)):
+    from scratch.figures import FIGURE_BUILDERS, PAGE_FIGURES
+
+    def callback(cube):
+        return [FIGURE_BUILDERS[name](cube).to_json() for name in PAGE_FIGURES]
+
+    filters = ("2023-01-01", "2024-06-30", ["Data Analyst", "Data Engineer"], ["Rejected", "No Response", "First Interview"])
+
+    print("cross-filter callback latency (date range + 2 roles + 3 results), uncached")
+    print(f"  {'rows':>10}  {'mask filter':>11}  {'cube filter':>11}  {'callback':>9}")
+    for n_rows in sizes:
+        df = apply_schema(synthetic_results(n_rows))
+        cube = build_cube(df)
+
+        mask_time, _ = timed(masked_cube, df, *filters)
+        cube_time, filtered = timed(filter_cube, cube, *filters)
+        callback_time, _ = timed(callback, filtered)
+
+        print(f"  {n_rows:>10,}  {mask_time * 1000:8.2f} ms  {cube_time * 1000:8.3f} ms  {callback_time * 1000:6.1f} ms")
+
+
+# a groupby + rolling sum per window and per rate, straight off the rows
+def groupby_rates(df, windows):
+    dates = pd.date_range(df["Date_Applied"].min(), df["Date_Applied"].max())
+    flags = pd.DataFrame({"Date_Applied": df["Date_Applied"],
+                          "Response": df["Result"] != "No Response",
+                          "Interview": df["Result"].str.contains("(?i)Interview|Offer"),
+                          "Rejection": df["Result"] == "Rejected"})
+    out = {}
+    for window in windows:
+        by_day = flags.groupby("Date_Applied").sum().reindex(dates, fill_value=0)
+        applied = flags.groupby("Date_Applied").size().reindex(dates, fill_value=0)
+        out[window] = by_day.rolling(window, min_periods=1).sum().div(applied.rolling(window, min_periods=1).sum(), axis=0)
+    return out
+
+
+def prefix_rates(cube, windows):
+    running = rate_prefix(cube)
+    return {window: rolling_rates(running, window) for window in windows}
+
+
+def bench_rates(n_rows=1_000_000, n_new=1_000):
+    df = apply_schema(synthetic_results(n_rows))
+    cube = build_cube(df)
+    windows = [7, 14, 30, 60, 90]
+
+    groupby_time, expected = timed(groupby_rates, df, windows)
+    prefix_time, rates = timed(prefix_rates, cube, windows)
+    for window in windows:
+        assert np.allclose(expected[window].values, rates[window].values, equal_nan=True)
+
+    # a day of new rows folded into the running totals
+    running = rate_prefix(cube)
+    new_rows = apply_schema(synthetic_results(n_new, seed=1, start=cube.dates[-1] + pd.Timedelta(days=1), days=1))
+    extend_time, _ = timed(extend_rate_prefix, running, build_cube(new_rows))
+
+    print(f"rolling rates over {n_rows:,} rows, {len(cube.dates):,} days, {len(windows)} windows")
+    print(f"  groupby + rolling:  {groupby_time:8.4f} s")
+    print(f"  prefix sums:        {prefix_time:8.4f} s  ({groupby_time / prefix_time:.1f}x)")
+    print(f"  append {n_new:,} rows:   {extend_time:8.4f} s")
+
+
+# one Arrow file vs one per month over a multi-year history: the full read, the last month,
+# whole-history totals, and a day of new rows
+def bench_partitions(n_rows=1_000_000, years=10):
+    from scratch.cube import manifest_cube
+
+    df = synthetic_results(n_rows, days=365 * years)
+    last = df["Date_Applied"].max()
+    month_start = last.to_period("M").start_time
+    new_rows = synthetic_results(1_000, seed=1, start=last, days=1)
+
+    def totals(path):
+        return role_counts(build_cube(read_results(path, ["Broad_Role", "Result", "Date_Applied"])))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        single_path = os.path.join(tmp, "results.arrow")
+        partitioned_path = os.path.join(tmp, "results")
+
+        single_write, _ = timed(write_results, df, single_path, repeat=1)
+        partitioned_write, _ = timed(write_results, df, partitioned_path, repeat=1)
+        single_read, _ = timed(read_results, single_path)
+        partitioned_read, _ = timed(read_results, partitioned_path)
+
+        def single_month():
+            dff = read_results(single_path)
+            return dff[dff["Date_Applied"] >= month_start]
+
+        single_month_time, expected = timed(single_month)
+        partitioned_month_time, month = timed(read_results, partitioned_path, date_range=(month_start, None))
+        assert len(expected) == len(month)
+
+        single_totals, expected = timed(totals, single_path)
+        manifest_totals, counts = timed(lambda: role_counts(manifest_cube(read_manifest(partitioned_path))))
+        assert (expected.values == counts.loc[expected.index, expected.columns].values).all()
+
+        single_append, _ = timed(append_results, new_rows, single_path, repeat=1)
+        partitioned_append, _ = timed(append_results, new_rows, partitioned_path, repeat=1)
+
+    print(f"{n_rows:,} rows over {years} years, single file vs one file per month")
+    print(f"  {'':>16}  {'single':>8}  {'partitioned':>11}")
+    for label, single, partitioned in [("write", single_write, partitioned_write),
+                                       ("read all", single_read, partitioned_read),
+                                       ("read last month", single_month_time, partitioned_month_time),
+                                       ("role totals", single_totals, manifest_totals),
+                                       ("append a day", single_append, partitioned_append)]:
+        print(f"  {label:>16}  {single:8.4f}  {partitioned:11.4f}  ({single / partitioned:.1f}x)")
+
+
+# the figure aggregates straight off the results file: per-figure groupby on the whole frame vs
+# the cell counts from each query backend (duckdb when it's installed)
+def bench_query(n_rows=10_000_000, *backends):
+    from scratch.query import query_cube, resolve_backend, BACKENDS
+
+    backends = backends or [backend for backend in BACKENDS if backend != "duckdb" or resolve_backend("auto") == "duckdb"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results_path = os.path.join(tmp, "results.arrow")
+        write_results(synthetic_results(n_rows), results_path)
+
+        groupby_time, expected = timed(lambda: legacy_aggregates(read_results(results_path)), repeat=1)
+        times = {}
+        for backend in backends:
+            times[backend], aggregates = timed(lambda: aggregates_from_cube(query_cube(results_path, backend)), repeat=1)
+            assert np.array_equal(aggregates[0].fillna(0).values, expected[0].loc[aggregates[0].index, aggregates[0].columns].fillna(0).values)
+
+    print(f"figure aggregates from a {n_rows:,} row results file, {os.cpu_count()} cores")
+    print(f"  {'pandas groupby':>16}: {groupby_time:8.3f} s")
+    for backend, seconds in times.items():
+        print(f"  {backend + ' cube':>16}: {seconds:8.3f} s  ({groupby_time / seconds:.1f}x)")
+
+
+# bytes on the wire for each page figure: plain JSON vs compacted, each raw and compressed;
+# "saved" is what compaction takes off plain JSON, and "saved <coding>" off the same JSON compressed
+def bench_payload(n_rows=100_000):
+    from scratch.figures import build_figures
+    from scratch.payload import compact_json, compress, encodings
+
+    cube = build_cube(apply_schema(synthetic_results(n_rows)))
+    codings = [coding for coding, _ in encodings()]
+
+    print(f"figure payloads over {n_rows:,} rows, KB")
+    print(f"  {'figure':>16}  {'json':>8}" + "".join(f"  {'json ' + coding:>10}" for coding in codings) +
+          f"  {'compact':>8}" + "".join(f"  {'compact ' + coding:>13}" for coding in codings) +
+          f"  {'saved':>6}" + "".join(f"  {'saved ' + coding:>11}" for coding in codings))
+    for name, fig in build_figures(cube).items():
+        plain = fig.to_json().encode("utf-8")
+        compact = compact_json(fig.to_json()).encode("utf-8")
+        plain_sizes = [len(plain)] + [len(compress(plain, coding)) for coding in codings]
+        compact_sizes = [len(compact)] + [len(compress(compact, coding)) for coding in codings]
+        saved = [1 - after / before for before, after in zip(plain_sizes, compact_sizes)]
+
+        print(f"  {name:>16}  {plain_sizes[0] / 1024:8.1f}" + "".join(f"  {size / 1024:10.1f}" for size in plain_sizes[1:]) +
+              f"  {compact_sizes[0] / 1024:8.1f}" + "".join(f"  {size / 1024:13.1f}" for size in compact_sizes[1:]) +
+              f"  {saved[0]:6.1%}" + "".join(f"  {ratio:11.1%}" for ratio in saved[1:]))
+
+
+def git_commit():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root, capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+# every stage of the pipeline, timed on its own, for one log size
+def stage_times(n_lines, tmp):
+    from scratch.figures import FIGURE_BUILDERS, PAGE_FIGURES
+    from scratch.export import export_figures
+
+    repeat = 3 if n_lines <= 100_000 else 1
+    log_path = os.path.join(tmp, f"log_{n_lines}.txt")
+    csv_path = os.path.join(tmp, "results.csv")
+    arrow_path = os.path.join(tmp, "results.arrow")
+    partitioned_path = os.path.join(tmp, f"results_{n_lines}")
+    times = {}
+
+    times["generate"], _ = timed(write_synthetic_log, log_path, n_lines, repeat=1)
+    times["parse"], df = timed(streaming_parse, log_path, repeat=repeat)
+    times["classify"], roles = timed(classify_roles, df["Title"], repeat=repeat)
+    df["Broad_Role"] = roles
+    df = df[["Date_Applied", "Result", "DOW", "year_month", "Broad_Role"]]
+
+    times["write_csv"], _ = timed(write_results, df, csv_path, repeat=repeat)
+    times["read_csv"], _ = timed(read_results, csv_path, repeat=repeat)
+    times["write_arrow"], _ = timed(write_results, df, arrow_path, repeat=repeat)
+    times["read_arrow"], df = timed(read_results, arrow_path, repeat=repeat)
+    times["create_dataframe"], _ = timed(create_dataframe, log_path, arrow_path, repeat=1)
+
+    # the partitioned directory the build writes by default; written once, since a second
+    # write over the same rows keeps every partition's file
+    times["write_partitioned"], _ = timed(write_results, df, partitioned_path, repeat=1)
+    times["read_partitioned"], _ = timed(read_results, partitioned_path, repeat=repeat)
+    times["read_manifest"], _ = timed(read_manifest, partitioned_path, repeat=repeat)
+    new_rows = synthetic_results(1_000, seed=1, start=df["Date_Applied"].max() + pd.Timedelta(days=1), days=1)
+    times["append_partitioned"], _ = timed(append_results, new_rows, partitioned_path, repeat=1)
+    times["create_dataframe_partitioned"], _ = timed(create_dataframe, log_path, os.path.join(tmp, f"built_{n_lines}"), repeat=1)
+
+    times["build_cube"], cube = timed(build_cube, df, repeat=repeat)
+    figs = {}
+    for name in PAGE_FIGURES:
+        times[name], figs[name] = timed(FIGURE_BUILDERS[name], cube, repeat=repeat)
+    times["category_pie_fig"], _ = timed(FIGURE_BUILDERS["category_pie_fig"], cube, cube.roles[0], repeat=repeat)
+    times["to_json"], _ = timed(lambda: [fig.to_json() for fig in figs.values()], repeat=repeat)
+
+    # a fresh directory each time so nothing is skipped as unchanged
+    pages = [(fig, name) for name, fig in figs.items()]
+    times["export"], _ = timed(export_figures, pages, os.path.join(tmp, f"docs_{n_lines}"), verbose=False, repeat=1)
+
+    os.remove(log_path)
+    return {"applications": len(df), "seconds": times}
+
+
+def bench_stages(*sizes, out_dir="bench_results"):
+    # python -m scratch.benchmarks stages 1000 100000 1000000
+    sizes = sizes or (1_000, 10_000, 100_000)
+    report = {"commit": git_commit(),
+              "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "python": platform.python_version(),
+              "pandas": pd.__version__,
+              "numpy": np.__version__,
+              "machine": platform.machine(),
+              "cpus": os.cpu_count(),
+              "runs": {}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_lines in sizes:
+            run = report["runs"][str(n_lines)] = stage_times(n_lines, tmp)
+            print(f"{n_lines:,} log lines ({run['applications']:,} applications)")
+            for stage, seconds in run["seconds"].items():
+                print(f"  {stage:>28}: {seconds:9.4f} s")
+
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{report['commit']}.json")
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"saved {path}")
+
+
+# stage-by-stage ratio of two saved runs; anything 10% slower is flagged
+def bench_compare(old_path, new_path, tolerance=0.1):
+    with open(old_path, "r", encoding="utf-8") as file:
+        old = json.load(file)
+    with open(new_path, "r", encoding="utf-8") as file:
+        new = json.load(file)
+
+    print(f"{old['commit']} -> {new['commit']}")
+    for size in [size for size in new["runs"] if size in old["runs"]]:
+        print(f"{int(size):,} log lines")
+        for stage, seconds in new["runs"][size]["seconds"].items():
+            before = old["runs"][size]["seconds"].get(stage)
+            if before is None:
+                print(f"  {stage:>28}: {'':>9}    {seconds:9.4f} s  (new)")
+                continue
+            ratio = seconds / before if before else float("inf")
+            flag = "  SLOWER" if ratio > 1 + tolerance else ""
+            print(f"  {stage:>28}: {before:9.4f} -> {seconds:9.4f} s  {ratio:5.2f}x{flag}")
+
+
+benchmarks = {"stages": bench_stages,
+              "compare": bench_compare,
+              "parse": bench_parse,
+              "classify": bench_classify,
+              "incremental": bench_incremental,
+              "storage": bench_storage,
+              "aggregates": bench_aggregates,
+              "time_series": bench_time_series,
+              "import": bench_import,
+              "figure_cache": bench_figure_cache,
+              "cross_filter": bench_cross_filter,
+              "rates": bench_rates,
+              "payload": bench_payload,
+              "partitions": bench_partitions,
+              "query": bench_query}
+
+if __name__ == "__main__":
+    # python -m scratch.benchmarks [name] [size ...]
+    name = sys.argv[1] if len(sys.argv) > 1 else "parse"
+    args = [int(a) if a.isdigit() else a for a in sys.argv[2:]]
+    benchmarks[name](*args)
@@ -1,65 +1,382 @@
 import pandas as pd
-from dateutil.parser import parse
+import numpy as np
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+import hashlib
+import itertools
+import json
+import re
 import os
+import zlib
 
-        
-def create_dataframe():
-
-    with open("scratch/applied_8_9_2022.txt", "r", encoding="utf-8") as file:
-        text = file.readlines()
-    
-    # filter job lines
-    date_dict = {}
-
-    for line in text:
-        try: 
-            date = parse(line)
-            date_dict[date] = []
-        except:
-            if ":" in line:
-                date_dict[date].append(line)
-
-    jobs_by_date = [item for sublist in [list(map(lambda vv: (k, vv), v)) for k, v in date_dict.items()] for item in sublist]
-
-
-    DOW_dict = {"Monday": 0,
-               "Tuesday": 1,
-               "Wednesday": 2,
-               "Thursday": 3,
-               "Friday": 4,
-               "Saturday": 5,
-               "Sunday": 6}
-
-    df = pd.DataFrame(jobs_by_date, columns=["Date_Applied", "Line"])
-    df["Company"] = df["Line"].str.strip().str.split(":").apply(lambda l: l[0].strip())
-    df["Title"] = df["Line"].str.strip().str.split(":|w.+\$$|==>", regex=True).apply(lambda l: l[1].strip().title())
-    df["Result"] = df["Line"].str.strip().str.split("==>").apply(lambda l: l[1].strip().title() if len(l) > 1 else "No Response")
-    df["DOW"] = df["Date_Applied"].apply(lambda d: d.day_name())
+from scratch.storage import write_results, append_results, read_results, concat_results, version_path
+from scratch.metrics import stage
+
+LOG_PATH = "scratch/applied_8_9_2022.txt"
+RESULTS_PATH = "scratch/application_results"
+
+# one application line from the log
+LogRecord = namedtuple("LogRecord", ["Date_Applied", "Company", "Title", "Result"])
+
+# a date header and the lines under it, with its byte range in the log
+LogBlock = namedtuple("LogBlock", ["date", "start", "end", "sha1", "lines"])
+
+# date headers are almost always "8/9/2022" or "2022-08-09", so check those before dateutil
+mdy_match = re.compile(r"^\s*(\d{1,2})/(\d{1,2})/(\d{4})\s*$")
+iso_match = re.compile(r"^\s*(\d{4})-(\d{1,2})-(\d{1,2})\s*$")
+title_split = re.compile(r":|w.+\$$|==>")
+# a header with a time ("8/9/2022 10:30") has a colon too, but starts with a digit, month or weekday
+date_start = re.compile(r"^\s*(\d|(jan(uary)?|feb(ruary)?|mar(ch)?|apr(il)?|may|june?|july?|aug(ust)?|"
+                        r"sep(t(ember)?)?|oct(ober)?|nov(ember)?|dec(ember)?|mon(day)?|tue(s(day)?)?|"
+                        r"wed(nesday)?|thu(r(s(day)?)?)?|fri(day)?|sat(urday)?|sun(day)?)\b)", re.IGNORECASE)
+
+# approximate size (in bytes) of each chunk pulled with readlines()
+CHUNK_SIZE = 1 << 20
+
+
+def parse_date_header(line):
+    m = mdy_match.match(line)
+    if m:
+        month, day, year = m.groups()
+    else:
+        m = iso_match.match(line)
+        if m:
+            year, month, day = m.groups()
+    if m:
+        try:
+            return datetime(int(year), int(month), int(day))
+        except ValueError:
+            pass
+
+    # application lines and blank lines are never headers
+    if not line.strip() or ":" in line and not date_start.match(line):
+        return None
+
+    # fall back to dateutil for any other header format
+    return parse_other_header(line)
+
+
+# bounded: most lines that get here aren't headers and never come up again
+@lru_cache(maxsize=4096)
+def parse_other_header(line):
+    from dateutil.parser import parse, ParserError
+    try:
+        # headers name the day, a time on the header line doesn't matter
+        return parse(line).replace(hour=0, minute=0, second=0, microsecond=0)
+    except (ParserError, ValueError, OverflowError):
+        return None
+
+
+def parse_line(date, line):
+    line = line.strip()
+    company = line.partition(":")[0].strip()
+    title = title_split.split(line, 2)[1].strip().title()
+    result = line.split("==>", 2)
+    result = result[1].strip().title() if len(result) > 1 else "No Response"
+
+    return LogRecord(date, company, title, result)
+
+
+# raw lines from an open log, pulled a chunk at a time
+def iter_raw_lines(file, chunk_size=CHUNK_SIZE):
+    while True:
+        lines = file.readlines(chunk_size)
+        if not lines:
+            return
+        yield from lines
+
+
+def iter_log_records(lines, date=None):
+    for line in lines:
+        new_date = parse_date_header(line)
+        if new_date is not None:
+            date = new_date
+        elif ":" in line and date is not None:
+            yield parse_line(date, line)
+
+
+def records_to_frame(records):
+    # dates come in runs under each header, so store them run-length encoded
+    run_dates, run_lengths = [], []
+    companies, titles, results = [], [], []
+
+    last_date = None
+    for record in records:
+        if record.Date_Applied is last_date:
+            run_lengths[-1] += 1
+        else:
+            last_date = record.Date_Applied
+            run_dates.append(last_date)
+            run_lengths.append(1)
+        companies.append(record.Company)
+        titles.append(record.Title)
+        results.append(record.Result)
+
+    dates = np.repeat(np.array(run_dates, dtype="datetime64[ns]"), run_lengths)
+
+    # str dtypes spelled out, so a log with no applications still has string columns
+    df = pd.DataFrame({"Date_Applied": dates,
+                       "Company": pd.Series(companies, dtype=str),
+                       "Title": pd.Series(titles, dtype=str),
+                       "Result": pd.Series(results, dtype=str)})
+    df["DOW"] = df["Date_Applied"].dt.day_name()
     df["year_month"] = df["Date_Applied"].dt.to_period("M").astype(str)
 
-    df_title = df["Title"]
+    return df
+
+
+# Broad_Role rules, highest priority first; a title gets the first role whose pattern it contains
+ROLE_RULES = [("Data Scientist", "Data Scientist|Data Science|Science|Scientist"),
+              ("ML Engineer", "Machine Learning Engineer|Machine Learning"),
+              ("Data Engineer", "Data Engineer|Engineer|Engineering|Database"),
+              ("Data Analyst", "Data Analyst|Data Analytics|Analytics|Analyst")]
+
+OTHER_ROLE = "Other"
+
+
+# rules table with columns priority, Broad_Role, pattern (lowest priority number wins)
+def read_role_rules(path):
+    rules = pd.read_csv(path).sort_values("priority", kind="stable")
+    return list(zip(rules["Broad_Role"], rules["pattern"]))
+
+
+def classify_roles(df_title, rules=ROLE_RULES):
+    # several rules may share a role, so map rule numbers onto category codes
+    roles = pd.Index([role for role, _ in rules] + [OTHER_ROLE])
+    categories = roles.unique()
+    rule_codes = categories.get_indexer(roles).astype(np.int8)
+
+    # classify each distinct title once, then broadcast back to every row
+    codes, titles = pd.factorize(df_title)
+    titles = pd.Series(titles)
+    title_codes = np.full(len(titles), rule_codes[-1], dtype=np.int8)
+
+    # each rule only scans the titles no higher priority rule has claimed
+    pending = np.arange(len(titles))
+    for rule_code, (_, pattern) in zip(rule_codes, rules):
+        if not len(pending):
+            break
+        hit = titles.iloc[pending].str.contains(pattern, case=False, regex=True).to_numpy(dtype=bool)
+        title_codes[pending[hit]] = rule_code
+        pending = pending[~hit]
+
+    return pd.Series(pd.Categorical.from_codes(title_codes[codes], categories),
+                     index=df_title.index, name="Broad_Role")
+
+
+def iter_log_blocks(path, start=0, date=None):
+    with open(path, "rb") as file:
+        file.seek(start)
+
+        block_start, block_hash, lines = start, hashlib.sha1(), []
+        offset = start
+        for raw in iter_raw_lines(file):
+            line = raw.decode("utf-8")
+            header = parse_date_header(line)
+            if header is not None and lines:
+                yield LogBlock(date, block_start, offset, block_hash.hexdigest(), lines)
+                block_start, block_hash, lines = offset, hashlib.sha1(), []
+            if header is not None:
+                date = header
+
+            block_hash.update(raw)
+            lines.append(line)
+            offset += len(raw)
+
+        if lines:
+            yield LogBlock(date, block_start, offset, block_hash.hexdigest(), lines)
+
+
+def iter_log_bytes(path, start, end, chunk_size=CHUNK_SIZE):
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = file.read(min(chunk_size, remaining))
+            if not chunk:
+                return
+            yield chunk
+            remaining -= len(chunk)
+
+
+def hash_log_range(path, start, end):
+    hasher = hashlib.sha1()
+    for chunk in iter_log_bytes(path, start, end):
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+# crc32 of the log up to `end`; it can be carried on from an earlier value, so an append only
+# checksums the new tail, and checking the old part is one pass at memory speed with no parsing
+def log_checksum(path, end, start=0, value=0):
+    for chunk in iter_log_bytes(path, start, end):
+        value = zlib.crc32(chunk, value)
+    return value
+
+
+def parse_blocks(blocks, summaries):
+    # yields every record while noting each block's row count for the checkpoint
+    for block in blocks:
+        records = list(iter_log_records(block.lines, block.date))
+        summaries.append({"date": block.date.isoformat() if block.date else None,
+                          "start": block.start,
+                          "end": block.end,
+                          "sha1": block.sha1,
+                          "rows": len(records),
+                          "newline": block.lines[-1].endswith("\n")})
+        yield from records
+
+
+def results_frame(records, role_rules, first_row=0):
+    # reading the log happens lazily inside records_to_frame, so it counts as parsing
+    with stage("parse"):
+        df = records_to_frame(records)
+    with stage("classify"):
+        df["Broad_Role"] = classify_roles(df["Title"], role_rules)
+    df.index += first_row
+    return df.drop(["Title", "Company"], axis=1)
+
+
+def checkpoint_path(output_path):
+    return output_path + ".checkpoint.json"
+
+
+def rules_hash(role_rules):
+    return hashlib.sha1(json.dumps([list(rule) for rule in role_rules]).encode("utf-8")).hexdigest()
+
+
+def read_checkpoint(output_path, role_rules):
+    try:
+        with open(checkpoint_path(output_path), "r", encoding="utf-8") as file:
+            checkpoint = json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    # anything that changed the output behind our back forces a full rebuild
+    if checkpoint.get("rules") != rules_hash(role_rules):
+        return None
+    if not os.path.exists(version_path(output_path)) or os.path.getsize(version_path(output_path)) != checkpoint.get("output_size"):
+        return None
+    return checkpoint
+
+
+def write_checkpoint(output_path, role_rules, blocks, checksum):
+    checkpoint = {"rules": rules_hash(role_rules),
+                  "log_size": blocks[-1]["end"] if blocks else 0,
+                  "log_crc32": checksum,
+                  "rows": sum(block["rows"] for block in blocks),
+                  "output_size": os.path.getsize(version_path(output_path)),
+                  "blocks": blocks}
+
+    tmp_path = checkpoint_path(output_path) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(checkpoint, file)
+    os.replace(tmp_path, checkpoint_path(output_path))
+
+
+def rebuild_results(log_path, output_path, role_rules):
+    blocks = []
+    df = results_frame(parse_blocks(iter_log_blocks(log_path), blocks), role_rules)
+
+    write_results(df, output_path)
+    write_checkpoint(output_path, role_rules, blocks, log_checksum(log_path, blocks[-1]["end"] if blocks else 0))
+    return "rebuild"
+
+
+def append_log_tail(log_path, output_path, role_rules, checkpoint, checksum):
+    blocks = checkpoint["blocks"]
+    last = blocks[-1] if blocks else None
+    date = datetime.fromisoformat(last["date"]) if last and last["date"] else None
+
+    tail = iter_log_blocks(log_path, checkpoint["log_size"], date)
+    first = next(tail, None)
+    tail = itertools.chain([first], tail) if first is not None else ()
+
+    summaries = []
+    df = results_frame(parse_blocks(tail, summaries), role_rules, checkpoint["rows"])
+
+    # new lines before the next header still belong to the last block
+    if last is not None and first is not None and parse_date_header(first.lines[0]) is None:
+        first = summaries.pop(0)
+        last.update(end=first["end"], rows=last["rows"] + first["rows"], newline=first["newline"],
+                    sha1=hash_log_range(log_path, last["start"], first["end"]))
+    blocks.extend(summaries)
+
+    if len(df):
+        append_results(df, output_path)
+    end = blocks[-1]["end"] if blocks else 0
+    write_checkpoint(output_path, role_rules, blocks, log_checksum(log_path, end, checkpoint["log_size"], checksum))
+    return "append"
+
+
+def upsert_log_blocks(log_path, output_path, role_rules, checkpoint):
+    # blocks whose header and bytes are unchanged keep their rows, everything else is re-parsed
+    old_rows = {}
+    row_start = 0
+    for block in checkpoint["blocks"]:
+        old_rows.setdefault((block["date"], block["sha1"]), []).append((row_start, block["rows"]))
+        row_start += block["rows"]
+
+    blocks, new_blocks = [], []
+    pieces = []
+    for block in iter_log_blocks(log_path):
+        key = (block.date.isoformat() if block.date else None, block.sha1)
+        if old_rows.get(key):
+            start, rows = old_rows[key].pop(0)
+            pieces.append(("old", start, rows))
+            blocks.append({"date": key[0], "start": block.start, "end": block.end,
+                           "sha1": block.sha1, "rows": rows, "newline": block.lines[-1].endswith("\n")})
+        else:
+            new_blocks.append(block)
+            pieces.append(("new", len(new_blocks) - 1, None))
+            blocks.append(None)
+
+    # parse the changed blocks in one go, then slot their summaries back into place
+    summaries = []
+    new_df = results_frame(parse_blocks(new_blocks, summaries), role_rules)
+    old_df = read_results(output_path)
+
+    new_starts = np.cumsum([0] + [summary["rows"] for summary in summaries])
+    positions = []
+    for i, (kind, start, rows) in enumerate(pieces):
+        if kind == "old":
+            positions.append(np.arange(start, start + rows))
+        else:
+            blocks[i] = summaries[start]
+            positions.append(len(old_df) + np.arange(new_starts[start], new_starts[start + 1]))
+
+    df = concat_results([old_df, new_df])
+    df = df.iloc[np.concatenate(positions) if positions else []].reset_index(drop=True)
+
+    write_results(df, output_path)
+    write_checkpoint(output_path, role_rules, blocks, log_checksum(log_path, blocks[-1]["end"] if blocks else 0))
+    return "upsert"
 
-    dse_match = "(?i)Data Scientist|Data Science|Science|Scientist"
-    da_match = "(?i)Data Analyst|Data Analytics|Analytics|Analyst"
-    ml_match = "(?i)Machine Learning Engineer|Machine Learning"
-    de_match = "(?i)Data Engineer|Engineer|Engineering|Database"
 
-    # fixing overlaps
-    dse_series = df_title[df_title.str.contains(dse_match)]
+def update_results(log_path, output_path, role_rules):
+    checkpoint = read_checkpoint(output_path, role_rules)
+    if checkpoint is None:
+        return rebuild_results(log_path, output_path, role_rules)
 
-    ml_series = df_title[df_title.str.contains(ml_match)]
-    de_series = df_title[df_title.str.contains(de_match)]
-    de_series = de_series[(~de_series.isin(ml_series)) & (~de_series.isin(dse_series))]
+    # a log that only grew past a complete last line just needs its tail parsed. The old part
+    # is still checksummed in full: updating an old entry's result also grows the file, and
+    # that has to go through upsert, so the append check stays one crc32 pass over the history
+    size = checkpoint["log_size"]
+    blocks = checkpoint["blocks"]
+    if os.path.getsize(log_path) >= size and (not blocks or blocks[-1]["newline"]):
+        checksum = log_checksum(log_path, size)
+        if checksum == checkpoint.get("log_crc32"):
+            return append_log_tail(log_path, output_path, role_rules, checkpoint, checksum)
 
-    da_series = df_title[df_title.str.contains(da_match)]
-    da_series = da_series[(~da_series.isin(dse_series)) & (~da_series.isin(de_series)) & (~da_series.isin(ml_series))]
+    return upsert_log_blocks(log_path, output_path, role_rules, checkpoint)
 
-    other_series = df_title[~((df_title.str.contains(dse_match)) | (df_title.str.contains(da_match)) | (df_title.str.contains(ml_match)) | (df_title.str.contains(de_match)))]
 
-    df["Broad_Role"] = pd.Series("Data Scientist", dse_series.index).combine_first(pd.Series("Data Analyst", da_series.index)) \
-        .combine_first(pd.Series("Data Engineer", de_series.index)) \
-        .combine_first(pd.Series("ML Engineer", ml_series.index)) \
-        .combine_first(pd.Series("Other", other_series.index))
+def create_dataframe(log_path=LOG_PATH, output_path=RESULTS_PATH, role_rules=ROLE_RULES, incremental=False):
+    if isinstance(role_rules, str):
+        role_rules = read_role_rules(role_rules)
 
-    df.drop(["Line", "Title", "Company"], axis=1).to_csv("scratch/Application_Results_12_31_2022.csv")
-    return
+    # how the results were brought up to date: "rebuild", "append" (only new rows at the end) or "upsert"
+    if incremental:
+        return update_results(log_path, output_path, role_rules)
+    return rebuild_results(log_path, output_path, role_rules)
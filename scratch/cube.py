@@ -0,0 +1,130 @@
+import pandas as pd
+import numpy as np
+from collections import namedtuple
+
+from scratch.storage import DOW_ORDER
+from scratch.metrics import timed
+
+# application counts per day x Broad_Role x Result; DOW and month are lookups on the day axis
+CountCube = namedtuple("CountCube", ["dates", "roles", "results", "counts"])
+
+
+@timed("build_cube")
+def build_cube(df):
+    dates = pd.date_range(df["Date_Applied"].min(), df["Date_Applied"].max()) if len(df) else pd.DatetimeIndex([])
+    roles = df["Broad_Role"].astype("category")
+    results = df["Result"].astype("category")
+
+    # one bincount over the flattened (day, role, result) position of every row
+    day_codes = ((df["Date_Applied"].values - dates.values[:1]) // np.timedelta64(1, "D")).astype(np.int64)
+    n_roles, n_results = len(roles.cat.categories), len(results.cat.categories)
+    flat = (day_codes * n_roles + roles.cat.codes.values) * n_results + results.cat.codes.values
+    counts = np.bincount(flat, minlength=len(dates) * n_roles * n_results) \
+        .reshape(len(dates), n_roles, n_results)
+
+    return CountCube(dates, roles.cat.categories, results.cat.categories, counts)
+
+
+# the cube already is a positional index: days are sorted, so a date range is one searchsorted
+# slice, and every role/result value owns a slice of its axis, so filters never touch rows
+def filter_cube(cube, start=None, end=None, roles=None, results=None):
+    first = cube.dates.searchsorted(pd.Timestamp(start)) if start else 0
+    last = cube.dates.searchsorted(pd.Timestamp(end), side="right") if end else len(cube.dates)
+
+    role_mask = cube.roles.isin(roles) if roles else np.ones(len(cube.roles), dtype=bool)
+    result_mask = cube.results.isin(results) if results else np.ones(len(cube.results), dtype=bool)
+
+    counts = cube.counts[first:last][:, role_mask][:, :, result_mask]
+    return CountCube(cube.dates[first:last], cube.roles[role_mask], cube.results[result_mask], counts)
+
+
+def empty_cube():
+    return CountCube(pd.DatetimeIndex([]), pd.Index([], dtype=str), pd.Index([], dtype=str), np.zeros((0, 0, 0), dtype=np.int64))
+
+
+# month-level cube from a partitioned dataset's manifest: each month's role x result counts sit
+# on its first day, which is enough for role, result and month totals but not for anything daily
+def manifest_cube(manifest):
+    months = sorted(manifest["partitions"])
+    roles, results = pd.Index(manifest["roles"]), pd.Index(manifest["results"])
+
+    counts = np.zeros((len(months), len(roles), len(results)), dtype=np.int64)
+    for i, month in enumerate(months):
+        for role, by_result in manifest["partitions"][month]["counts"].items():
+            for result, n in by_result.items():
+                counts[i, roles.get_loc(role), results.get_loc(result)] = n
+
+    return CountCube(pd.DatetimeIndex([pd.Period(month, "M").start_time for month in months]), roles, results, counts)
+
+
+# sum two cubes over the union of their days, roles and results
+def merge_cubes(a, b):
+    if not len(a.dates):
+        return b
+    if not len(b.dates):
+        return a
+
+    dates = pd.date_range(min(a.dates[0], b.dates[0]), max(a.dates[-1], b.dates[-1]))
+    roles = a.roles.append(b.roles.difference(a.roles, sort=False))
+    results = a.results.append(b.results.difference(a.results, sort=False))
+
+    counts = np.zeros((len(dates), len(roles), len(results)), dtype=np.int64)
+    for cube in (a, b):
+        days = dates.get_indexer(cube.dates)
+        counts[np.ix_(days, roles.get_indexer(cube.roles), results.get_indexer(cube.results))] += cube.counts
+
+    return CountCube(dates, roles, results, counts)
+
+
+# long (Date_Applied, Broad_Role, Result, count) table of the non-empty cells
+def cube_to_frame(cube):
+    days, roles, results = np.nonzero(cube.counts)
+    return pd.DataFrame({"Date_Applied": cube.dates[days],
+                         "Broad_Role": pd.Categorical.from_codes(roles, cube.roles),
+                         "Result": pd.Categorical.from_codes(results, cube.results),
+                         "count": cube.counts[days, roles, results]})
+
+
+def to_frame(counts, index, columns, index_name):
+    # same shape as groupby(...).size().unstack(): unobserved rows/columns dropped, gaps as NaN
+    df = pd.DataFrame(counts, index=pd.Index(index, name=index_name), columns=pd.Index(columns, name="Result"))
+    df = df.loc[df.sum(axis=1) > 0, df.sum(axis=0) > 0]
+    return df.where(df > 0)
+
+
+def daily_counts(cube):
+    return pd.Series(cube.counts.sum(axis=(1, 2)), index=cube.dates)
+
+
+def role_counts(cube):
+    return to_frame(cube.counts.sum(axis=0), cube.roles, cube.results, "Broad_Role")
+
+
+def dow_counts(cube):
+    by_dow = np.zeros((len(DOW_ORDER), len(cube.results)), dtype=np.int64)
+    np.add.at(by_dow, cube.dates.dayofweek.values, cube.counts.sum(axis=1))
+    return to_frame(by_dow, DOW_ORDER, cube.results, "DOW")
+
+
+def month_counts(cube):
+    month_codes, months = pd.factorize(cube.dates.to_period("M"))
+    by_month = np.zeros((len(months), len(cube.results)), dtype=np.int64)
+    np.add.at(by_month, month_codes, cube.counts.sum(axis=1))
+    return to_frame(by_month, months.astype(str), cube.results, "year_month")
+
+
+def result_counts(cube, role=None):
+    if role is None:
+        counts = cube.counts.sum(axis=(0, 1))
+    elif role in cube.roles:
+        counts = cube.counts[:, cube.roles.get_loc(role)].sum(axis=0)
+    else:
+        counts = np.zeros(len(cube.results), dtype=np.int64)
+    counts = pd.Series(counts, index=pd.Index(cube.results, name="Result"), name="count")
+    return counts[counts > 0].sort_values(ascending=False, kind="stable")
+
+
+# days with at least one application whose Result matches the pattern
+def result_dates(cube, pattern):
+    matches = cube.results.str.contains(pattern, regex=True)
+    return cube.dates[cube.counts[:, :, matches].sum(axis=(1, 2)) > 0]
@@ -0,0 +1,130 @@
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import os
+import time
+
+from scratch.metrics import metrics, timed
+
+PLOTLYJS_NAME = "plotly.min.js"
+MANIFEST_NAME = "figures.json"
+
+
+def write_if_changed(path, content):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as file:
+            if file.read() == content:
+                return False
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(content)
+    return True
+
+
+def write_plotlyjs(out_dir):
+    # one copy of plotly.js that every figure page loads with a <script src>
+    from plotly.offline import get_plotlyjs
+
+    return write_if_changed(os.path.join(out_dir, PLOTLYJS_NAME), get_plotlyjs())
+
+
+def render_figure(fig_json, path, plotlyjs_src=PLOTLYJS_NAME):
+    import plotly.io as pio
+
+    start = time.perf_counter()
+    html = pio.to_html(json.loads(fig_json), include_plotlyjs=plotlyjs_src, full_html=True, validate=False,
+                       div_id=os.path.splitext(os.path.basename(path))[0])
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(html)
+
+    return time.perf_counter() - start
+
+
+def read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def write_manifest(out_dir, manifest):
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+
+
+# variants are rewritten when the file changed or a variant is missing
+def write_variants(path, changed):
+    from scratch.payload import encodings, write_compressed
+
+    if changed or not all(os.path.exists(path + suffix) for _, suffix in encodings()):
+        return write_compressed(path)
+
+    sizes = {"identity": os.path.getsize(path)}
+    sizes.update({coding: os.path.getsize(path + suffix) for coding, suffix in encodings()})
+    return sizes
+
+
+# plotlyjs_src points the pages at a bundle somewhere else instead of writing one into out_dir;
+# compact pages carry compacted figure JSON and get precompressed .gz/.br variants
+@timed("export_figures")
+def export_figures(figs, out_dir="docs", max_workers=None, verbose=True, plotlyjs_src=None, compact=False):
+    import plotly
+    from scratch.payload import remove_compressed
+
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    if plotlyjs_src is None:
+        changed = write_plotlyjs(out_dir)
+        plotlyjs_src = PLOTLYJS_NAME
+        if compact:
+            write_variants(os.path.join(out_dir, PLOTLYJS_NAME), changed)
+        else:
+            remove_compressed(os.path.join(out_dir, PLOTLYJS_NAME))
+
+    # figures whose JSON hasn't changed since the last export keep their page
+    manifest = read_manifest(out_dir)
+    report, pending = {}, {}
+    for fig, name in figs:
+        path = os.path.join(out_dir, name + ".html")
+        fig_json = fig.to_json()
+        if compact:
+            from scratch.payload import compact_json
+
+            fig_json = compact_json(fig_json)
+        fig_hash = hashlib.sha1((plotly.__version__ + plotlyjs_src + fig_json).encode("utf-8")).hexdigest()
+
+        if manifest.get(name) == fig_hash and os.path.exists(path):
+            report[name] = {"status": "unchanged", "seconds": 0.0, "bytes": os.path.getsize(path)}
+        else:
+            pending[name] = (fig_json, path, fig_hash)
+
+    if len(pending) > 1 and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=min(len(pending), max_workers or os.cpu_count() or 1)) as pool:
+            futures = {name: pool.submit(render_figure, fig_json, path, plotlyjs_src) for name, (fig_json, path, _) in pending.items()}
+            seconds = {name: future.result() for name, future in futures.items()}
+    else:
+        seconds = {name: render_figure(fig_json, path, plotlyjs_src) for name, (fig_json, path, _) in pending.items()}
+
+    for name, (_, path, fig_hash) in pending.items():
+        # pages may render in other processes, so their times are recorded here
+        metrics.observe("render_figure", seconds[name])
+        manifest[name] = fig_hash
+        report[name] = {"status": "written", "seconds": seconds[name], "bytes": os.path.getsize(path)}
+    write_manifest(out_dir, manifest)
+
+    # a plain export after a compact one mustn't leave the old compressed pages to be served
+    for name, row in report.items():
+        if compact:
+            row["encoded"] = write_variants(os.path.join(out_dir, name + ".html"), row["status"] == "written")
+        else:
+            remove_compressed(os.path.join(out_dir, name + ".html"))
+
+    report = {name: report[name] for _, name in figs}
+    if verbose:
+        for name, row in report.items():
+            sizes = "".join(f"  {size / 1024:8.1f} KB {coding}" for coding, size in row.get("encoded", {}).items()
+                            if coding != "identity")
+            print(f"{name:>16}: {row['status']:>9}  {row['seconds']:6.3f} s  {row['bytes'] / 1024:8.1f} KB{sizes}")
+        print(f"{'total':>16}: {time.perf_counter() - start:16.3f} s")
+
+    return report
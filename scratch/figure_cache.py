@@ -0,0 +1,68 @@
+from collections import OrderedDict
+import os
+import threading
+import time
+
+
+# what a results file looks like on disk; changes whenever it's rewritten or appended to
+def data_version(path):
+    # a partitioned dataset is rewritten manifest last
+    if os.path.isdir(path):
+        path = os.path.join(path, "manifest.json")
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# LRU + TTL cache of serialized figures, keyed by (figure, params) for one data version
+class FigureCache:
+
+    def __init__(self, maxsize=256, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = None
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        with self.lock:
+            # anything cached for an older version of the data is stale
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+                return None
+
+            entry = self.entries.get(key)
+            if entry is None or (self.ttl is not None and time.monotonic() - entry[0] > self.ttl):
+                self.entries.pop(key, None)
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, value):
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def get_or_build(self, key, version, build):
+        value = self.get(key, version)
+        if value is None:
+            with self.lock:
+                self.misses += 1
+            # built outside the lock; two requests racing on a miss both build, and one wins
+            value = build()
+            self.put(key, version, value)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.version = None
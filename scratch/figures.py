@@ -0,0 +1,304 @@
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+import pandas as pd
+
+from scratch.cube import daily_counts, role_counts, dow_counts, month_counts, result_counts, result_dates
+from scratch.rates import RATE_WINDOWS, rate_prefix, rolling_rates, waiting_days
+from scratch.metrics import timed
+
+
+# Result color map
+result_colors = {
+              "Total": "blue",
+              "No Response": "salmon",  
+              "Rejected": "crimson",
+              "Contacted": "gold",
+              "First Interview": "seagreen",
+              "Second Intervew": "mediumseagreen",
+              "Third Interview": "mediumaquamarine",
+              "Offer": "lime",
+              "Scam": "purple"
+}
+
+# use background color from App.css
+bg_color = "#DDC3F8"
+
+# vertical lines for time series
+resume_dates = ["2022-08-12", "2022-08-19", "2022-08-31", "2022-09-05"]
+
+# rolling rate lines: color per rate, dash per window
+rate_colors = {"Response": "gold", "Interview": "seagreen", "Rejection": "crimson"}
+window_dashes = ["solid", "dash", "dot", "dashdot"]
+
+# past this many days the time series switches to WebGL and coarser bars
+WEBGL_THRESHOLD = 1000
+MAX_BARS = 500
+
+# bar frequencies to fall back on, finest first
+BAR_FREQS = [("D", "Daily", "Day"), ("W", "Weekly", "Week"), ("MS", "Monthly", "Month"), ("QS", "Quarterly", "Quarter")]
+
+
+def add_daily_counts(fig, date_count):
+    # downsample the bars server-side once there are too many days to draw one each
+    for freq, label, unit in BAR_FREQS:
+        bar_count = date_count if freq == "D" else date_count.resample(freq).sum()
+        if len(bar_count) <= MAX_BARS:
+            break
+
+    cumulative = date_count.cumsum()
+    scatter = go.Scattergl if len(date_count) > WEBGL_THRESHOLD else go.Scatter
+
+    fig.add_bar(x=bar_count.index, y=bar_count.values, name=f"{label} Count", secondary_y=False)
+    fig.add_trace(scatter(x=cumulative.index, y=cumulative.values, name="Cumulative Count", fillcolor="orange"), secondary_y=True)
+    fig.update_yaxes(title_text=f"# of Applications Per {unit}", secondary_y=False)
+
+    return bar_count
+
+
+def add_event_markers(fig, dates, y_range, name, line):
+    # every event is a vertical segment in one trace, separated by None gaps
+    if not len(dates):
+        return
+
+    x, y = [], []
+    for date in dates:
+        x += [str(date), str(date), None]
+        y += [y_range[0], y_range[1], None]
+
+    fig.add_trace(go.Scatter(x=x,
+                             y=y,
+                             mode="lines",
+                             line=line,
+                             name=name,
+                             legendgroup=name,
+                             connectgaps=False))
+
+
+def sorted_role_group(cube):
+    # bar graph role groupby
+    role_group = role_counts(cube)
+
+    role_group["Total"] = role_group.sum(axis=1)
+
+    return role_group.assign(temp_sum=role_group.sum(axis=1)) \
+        .sort_values(by="temp_sum", ascending=False).iloc[:,:-1] \
+        .reindex(role_group.mean(axis=0).sort_values(ascending=False).index, axis=1)
+
+@timed("create_role_fig")
+def create_role_fig(cube):
+    role_group_to_bar = sorted_role_group(cube)
+
+    role_group_fig = px.bar(role_group_to_bar,
+                barmode="group",
+                color_discrete_map=result_colors,
+                labels=dict(Broad_Role="Broad Role Category", 
+                            value="# of Applications"),
+                title="Application Results by Role Category"
+                )
+    
+    role_group_fig.update_layout(plot_bgcolor=bg_color, paper_bgcolor=bg_color)
+    
+    return role_group_fig, role_group_to_bar
+    
+@timed("create_time_series_fig")
+def create_time_series_fig(cube):    
+    
+    time_series_fig = make_subplots(specs=[[{"secondary_y": True}]])
+
+    bar_count = add_daily_counts(time_series_fig, daily_counts(cube))
+    y_range = [bar_count.min(), bar_count.max()+1]
+
+    time_series_fig.update_layout(yaxis_range=y_range, title_text="Applications Over Time",plot_bgcolor=bg_color, paper_bgcolor=bg_color)
+    time_series_fig.update_yaxes(title_text="Cumulative # of Applications", secondary_y=True)
+
+    # one trace per kind of event, limited to the dates shown
+    shown_resume_dates = [x for x in resume_dates if len(cube.dates) and cube.dates[0] <= pd.Timestamp(x) <= cube.dates[-1]]
+    add_event_markers(time_series_fig, shown_resume_dates, y_range,
+                      name="Resume Updated",
+                      line=dict(color='red', width=2, dash='dash'))
+
+    add_event_markers(time_series_fig, result_dates(cube, "(?i)Interview").strftime("%Y-%m-%d"), y_range,
+                      name="Application(s) Led to Interview",
+                      line=dict(color='green', width=1, dash='dashdot'))
+
+    add_event_markers(time_series_fig, result_dates(cube, "Offer").strftime("%Y-%m-%d"), y_range,
+                      name="Application(s) Led to Offer",
+                      line=dict(color='black', width=1, dash='longdashdot'))
+    
+    return time_series_fig
+    
+@timed("create_pie_fig")
+def create_pie_fig(cube, rgroup):  
+    cats = ["Overall"] + list(rgroup.index)
+
+    # three donuts per row; filters can leave fewer role categories than the usual five
+    rows = -(-len(cats) // 3)
+    pie_fig = make_subplots(rows, 3, subplot_titles=[cat + " Applications" for cat in cats], specs=[[{'type':'domain'}]*3]*rows, row_heights=[0.7, 0.3] if rows == 2 else None)
+
+    s = pd.Series(result_colors).drop("Total").reindex(rgroup.drop("Total", axis=1).columns)
+
+    i, j = 1, 1
+    for pie_category in cats:
+
+        pie_category = pie_category if pie_category is not None else "Overall"
+
+        if pie_category == "Overall":
+            counts = result_counts(cube)
+            pie_fig.add_trace(go.Pie(values=counts, 
+                        labels=counts.index,
+                        marker=dict(colors=s.reindex(counts.index)),
+                        scalegroup='one',
+                        hole=0.4,
+                        name=""), i, j) 
+        else:
+            counts = result_counts(cube, pie_category)
+
+            pie_fig.add_trace(go.Pie(values=counts, 
+                    labels=counts.index,
+                    scalegroup='one',
+                    marker=dict(colors=s.reindex(counts.index)),
+                    hole=0.4,
+                    name=""), i, j) # donut
+
+        # update text labels on pie slices
+        pie_fig.update_traces(textinfo="value+percent", texttemplate="(%{value})<br>%{percent}")
+
+        i = i if j < 3 else i + 1
+        j = j + 1 if j < 3 else 1
+
+    pie_fig.update_layout(height=600, title_text='Overall Results of Applications', font=dict(size=10), plot_bgcolor=bg_color, paper_bgcolor=bg_color, margin=dict(b=0))
+    
+    return pie_fig
+
+# single donut for the pie-cats dropdown
+@timed("create_category_pie_fig")
+def create_category_pie_fig(cube, pie_category):
+    counts = result_counts(cube, None if pie_category == "Overall" else pie_category)
+
+    pie_fig = px.pie(values=counts, names=counts.index,
+                    color=counts.index,
+                    color_discrete_map=result_colors,
+                    hole=0.4) # donut
+
+    # update text labels on pie slices
+    pie_fig.update_traces(textinfo="value+percent", texttemplate="(%{value})<br>%{percent}")
+
+    # update title
+    pie_fig.update_layout(title=dict(text=f"{pie_category} Applications", xanchor="center", x=0.5), font=dict(size=12),
+                          plot_bgcolor=bg_color, paper_bgcolor=bg_color)
+
+    return pie_fig
+    
+# dow
+@timed("create_dow_fig")
+def create_dow_fig(cube):       
+    dow_group = dow_counts(cube)
+
+    dow_group["Total"] = dow_group.sum(axis=1)
+
+    dow_group = dow_group.reindex(dow_group.mean(axis=0) \
+                .sort_values(ascending=False).index, axis=1)
+
+    dow_fig = px.bar(dow_group,
+                barmode="group",
+                color_discrete_map=result_colors,
+                labels=dict(DOW="Day of Application", 
+                            value="# of Applications"),
+                title="Application Results by Day of the Week"
+                )   
+    
+    dow_fig.update_layout(plot_bgcolor=bg_color, paper_bgcolor=bg_color)
+    
+    return dow_fig
+
+# month
+@timed("create_month_fig")
+def create_month_fig(cube):
+    month_group = month_counts(cube)
+
+    month_group["Total"] = month_group.sum(axis=1)
+
+    month_group = month_group.reindex(month_group.mean(axis=0) \
+                  .sort_values(ascending=False).index, axis=1)
+
+    month_fig = px.bar(month_group,
+                barmode="group",
+                color_discrete_map=result_colors,
+                labels=dict(year_month="Month", 
+                            value="# of Applications"),
+                title="Application Results by Month"
+                )  
+
+    month_fig.update_xaxes(
+    dtick="M1",
+    tickformat="%b %Y")  
+    
+    month_fig.update_layout(plot_bgcolor=bg_color, paper_bgcolor=bg_color)
+    
+    return month_fig
+
+
+# rolling rates from one set of running totals; every window is a subtraction over them.
+# Totals already kept for the cube (and extended on appends) can be passed in as `running`
+@timed("create_rates_fig")
+def create_rates_fig(cube, windows=RATE_WINDOWS, running=None):
+    running = rate_prefix(cube) if running is None else running
+    scatter = go.Scattergl if len(running.dates) > WEBGL_THRESHOLD else go.Scatter
+
+    rates_fig = go.Figure()
+    for i, window in enumerate(sorted(windows)):
+        rates = rolling_rates(running, window)
+        for name in rates.columns:
+            rates_fig.add_trace(scatter(x=rates.index,
+                                        y=rates[name].values,
+                                        mode="lines",
+                                        name=f"{name} Rate ({window}-Day)",
+                                        legendgroup=name,
+                                        line=dict(color=rate_colors[name], dash=window_dashes[i % len(window_dashes)])))
+
+    rates_fig.update_layout(title_text="Rolling Response Rates", yaxis_tickformat=".0%",
+                            yaxis_title="Share of Applications in Window", plot_bgcolor=bg_color, paper_bgcolor=bg_color)
+
+    return rates_fig
+
+# weeks each unanswered application has been waiting
+@timed("create_waiting_fig")
+def create_waiting_fig(cube):
+    waiting = waiting_days(cube)
+    by_week = waiting.groupby(waiting.index // 7).sum()
+
+    waiting_fig = go.Figure(go.Bar(x=by_week.index, y=by_week.values, name="No Response",
+                                   marker_color=result_colors["No Response"]))
+
+    waiting_fig.update_layout(title_text="Time Without a Response", xaxis_title="Weeks Since Applying",
+                              yaxis_title="# of Applications", plot_bgcolor=bg_color, paper_bgcolor=bg_color)
+
+    return waiting_fig
+
+
+# builders by figure name; extra arguments after the cube are the figure's filter params
+FIGURE_BUILDERS = {"role_fig": lambda cube: create_role_fig(cube)[0],
+                   "time_series_fig": create_time_series_fig,
+                   "month_fig": create_month_fig,
+                   "dow_fig": create_dow_fig,
+                   "pie_fig": lambda cube: create_pie_fig(cube, sorted_role_group(cube)),
+                   "category_pie_fig": create_category_pie_fig,
+                   "rates_fig": create_rates_fig,
+                   "waiting_fig": create_waiting_fig}
+
+# figures on the page
+PAGE_FIGURES = ["role_fig", "time_series_fig", "rates_fig", "waiting_fig", "month_fig", "dow_fig", "pie_fig"]
+
+
+# every figure on the page, built from one count cube
+def build_figures(cube):
+    role_fig, role_group = create_role_fig(cube)
+
+    return {"role_fig": role_fig,
+            "time_series_fig": create_time_series_fig(cube),
+            "rates_fig": create_rates_fig(cube),
+            "waiting_fig": create_waiting_fig(cube),
+            "month_fig": create_month_fig(cube),
+            "dow_fig": create_dow_fig(cube),
+            "pie_fig": create_pie_fig(cube, role_group)}
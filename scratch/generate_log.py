@@ -0,0 +1,77 @@
+import random
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+companies = ["NYT", "SPOTIFY", "DOW JONES", "MANTECH", "OSCAR HEALTH", "PINTEREST",
+             "NUNA", "HORNBLOWER GROUP", "MyFitnessPal", "HIREMATCH", "CIGNA", "IBM"]
+
+titles = ["Data Scientist", "Data Analyst", "Data Engineer", "Machine Learning Engineer",
+          "Data Science/Analytics New Graduate", "Data Insights (Games)", "Data Specialist",
+          "Integrity Analyst", "Junior Data Engineer", "Statistical Programmer",
+          "Health Data Analyst Associate", "Nlp Intern", "Database Developer"]
+
+# weights roughly follow the 2022 log
+results = ["No Response", "Rejected", "Contacted", "First Interview",
+           "Second Intervew", "Third Interview", "Offer", "Scam"]
+result_weights = [62, 31, 2, 2.5, 0.5, 0.7, 0.1, 1.2]
+
+
+# titles with a numbered suffix so only some of them repeat, like a real log
+def synthetic_titles(n_titles, seed=0, distinct=50_000):
+    rng = random.Random(seed)
+    return [f"{rng.choice(titles)} {rng.randrange(distinct)}".title() for _ in range(n_titles)]
+
+
+def write_synthetic_log(path, n_lines, seed=0, start=date(2022, 8, 9), per_day=None):
+    rng = random.Random(seed)
+
+    # keep big logs inside a few years of dates
+    per_day = per_day or max(8, n_lines // 1500)
+
+    day = start
+    written = 0
+    with open(path, "w", encoding="utf-8") as file:
+        while written < n_lines:
+            # now and then a header with a time, which only dateutil reads
+            time = " 10:30" if day.toordinal() % 7 == 0 else ""
+            file.write(f"{day.month}/{day.day}/{day.year}{time}\n")
+            written += 1
+
+            for _ in range(rng.randint(0, 2 * per_day)):
+                if written >= n_lines:
+                    break
+                line = f"{rng.choice(companies)}: {rng.choice(titles)}"
+                if rng.random() < 0.2:
+                    line += " - wordleBitch123$"
+                result = rng.choices(results, result_weights)[0]
+                if result != "No Response":
+                    line += f" ==> {result}"
+                file.write(line + "\n")
+                written += 1
+
+            file.write("\n")
+            written += 1
+            day += timedelta(days=1)
+
+
+# results table as create_dataframe() writes it, without going through a log
+def synthetic_results(n_rows, seed=0, start="2022-08-09", days=1500):
+    rng = np.random.default_rng(seed)
+
+    weights = np.array(result_weights) / sum(result_weights)
+    df = pd.DataFrame({"Date_Applied": pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.integers(0, days, n_rows)), unit="D"),
+                       "Result": rng.choice(results, n_rows, p=weights),
+                       "Broad_Role": rng.choice(["Data Scientist", "ML Engineer", "Data Engineer", "Data Analyst", "Other"], n_rows)})
+    df["DOW"] = df["Date_Applied"].dt.day_name()
+    df["year_month"] = df["Date_Applied"].dt.to_period("M").astype(str)
+
+    return df[["Date_Applied", "Result", "DOW", "year_month", "Broad_Role"]]
+
+
+if __name__ == "__main__":
+    # python -m scratch.generate_log <path> <n_lines> [seed]
+    path, n_lines = sys.argv[1], int(sys.argv[2])
+    write_synthetic_log(path, n_lines, seed=int(sys.argv[3]) if len(sys.argv) > 3 else 0)
@@ -0,0 +1,193 @@
+from contextlib import contextmanager
+from functools import wraps
+import json
+import os
+import sys
+import threading
+import time
+
+# logging and tracemalloc are imported when first needed, so `import app` stays cheap
+
+# latency histogram buckets in seconds, Prometheus style (each counts everything at or below it)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# opt-in extras, off unless set here or through the environment:
+# PROFILE_DIR gets one cProfile dump per stage, TRACE_MEMORY turns on tracemalloc peaks per stage
+PROFILE_DIR = os.environ.get("DASHJOURNEY_PROFILE") or None
+TRACE_MEMORY = bool(os.environ.get("DASHJOURNEY_TRACE_MEMORY"))
+
+
+def configure(profile_dir=None, trace_memory=False):
+    global PROFILE_DIR, TRACE_MEMORY
+
+    PROFILE_DIR = profile_dir or PROFILE_DIR
+    TRACE_MEMORY = trace_memory or TRACE_MEMORY
+    if TRACE_MEMORY:
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+def max_rss():
+    # process high-water mark in bytes; not available on Windows
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if os.uname().sysname == "Darwin" else rss * 1024
+
+
+# per-stage latency histograms plus the largest traced peak seen for each stage
+class Metrics:
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.local = threading.local()
+
+    def observe(self, name, seconds, peak=None):
+        with self.lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = {"buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0, "peak": None}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    stats["buckets"][i] += 1
+            stats["count"] += 1
+            stats["sum"] += seconds
+            if peak is not None:
+                stats["peak"] = max(stats["peak"] or 0, peak)
+
+        # the run this thread is in, if any, gets every stage for its log line
+        run = getattr(self.local, "run", None)
+        if run is not None:
+            run.append({"stage": name, "seconds": round(seconds, 6), "peak_mb": peak and round(peak / 2**20, 1)})
+
+    def snapshot(self):
+        with self.lock:
+            return {name: dict(stats, buckets=list(stats["buckets"])) for name, stats in self.stages.items()}
+
+    def clear(self):
+        with self.lock:
+            self.stages.clear()
+
+    # Prometheus text format, for the /metrics endpoint
+    def render(self, extra=()):
+        lines = ["# HELP dashjourney_stage_seconds Time spent in each pipeline stage and callback.",
+                 "# TYPE dashjourney_stage_seconds histogram"]
+        stages = self.snapshot()
+        for name, stats in sorted(stages.items()):
+            for bound, count in zip(self.buckets, stats["buckets"]):
+                lines.append(f'dashjourney_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'dashjourney_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {stats["count"]}')
+            lines.append(f'dashjourney_stage_seconds_sum{{stage="{name}"}} {stats["sum"]:.6f}')
+            lines.append(f'dashjourney_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+
+        peaks = [(name, stats["peak"]) for name, stats in sorted(stages.items()) if stats["peak"] is not None]
+        if peaks:
+            lines += ["# HELP dashjourney_stage_peak_bytes Largest traced allocation peak inside each stage.",
+                      "# TYPE dashjourney_stage_peak_bytes gauge"]
+            lines += [f'dashjourney_stage_peak_bytes{{stage="{name}"}} {peak}' for name, peak in peaks]
+
+        rss = max_rss()
+        if rss is not None:
+            lines += ["# TYPE dashjourney_max_rss_bytes gauge", f"dashjourney_max_rss_bytes {rss}"]
+
+        for name, kind, value in extra:
+            lines += [f"# TYPE {name} {kind}", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def dump_profile(profiler, name):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof")
+    profiler.dump_stats(path)
+    return path
+
+
+@contextmanager
+def stage(name):
+    # only one profiler can be active, so a stage inside a profiled one is covered by its dump
+    profiler = None
+    if PROFILE_DIR and not getattr(metrics.local, "profiling", False):
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            metrics.local.profiling = True
+        except ValueError:
+            # another thread's profiler (3.12+ allows one per process)
+            profiler = None
+
+    # tracemalloc only has one peak, so an outer stage folds in its inner stages' peaks
+    peaks = getattr(metrics.local, "peaks", None)
+    if peaks is None:
+        peaks = metrics.local.peaks = []
+    tracemalloc = sys.modules.get("tracemalloc")
+    tracing = tracemalloc is not None and tracemalloc.is_tracing()
+    if tracing:
+        if peaks:
+            peaks[-1] = max(peaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        peaks.append(0)
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        peak = None
+        if tracing:
+            peak = max(peaks.pop(), tracemalloc.get_traced_memory()[1])
+            if peaks:
+                peaks[-1] = max(peaks[-1], peak)
+        if profiler is not None:
+            profiler.disable()
+            metrics.local.profiling = False
+            dump_profile(profiler, name)
+        metrics.observe(name, seconds, peak)
+
+
+def timed(name):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# one stage that also writes a single JSON log line with everything timed inside it
+@contextmanager
+def run(name, **fields):
+    outer = getattr(metrics.local, "run", None)
+    metrics.local.run = []
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        with stage(name):
+            yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        stages = metrics.local.run
+        metrics.local.run = outer
+        if outer is not None:
+            outer.append(stages[-1])
+        stages = stages[:-1]
+        import logging
+
+        rss = max_rss()
+        logging.getLogger("dashjourney").info(json.dumps({"event": "run", "run": name, "status": status,
+                                "seconds": round(time.perf_counter() - start, 6),
+                                "max_rss_mb": rss and round(rss / 2**20, 1),
+                                **fields, "stages": stages}))
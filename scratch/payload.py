@@ -0,0 +1,195 @@
+import base64
+import gzip
+import json
+import os
+import re
+
+import numpy as np
+
+# brotli is optional; without it only gzip variants are written and served
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# trace attributes whose value is plotly.js's default anyway
+TRACE_DEFAULTS = {"xaxis": "x", "yaxis": "y", "showlegend": True, "visible": True}
+TYPE_DEFAULTS = {"bar": {"textposition": "auto"}}
+
+# traces where an evenly spaced date axis can be sent as a start and a step
+STEP_TRACES = ("bar", "scatter", "scattergl")
+
+# smallest typed array each kind of number fits in, in the order tried
+INT_DTYPES = [np.int8, np.uint8, np.int16, np.uint16, np.int32, np.uint32]
+
+# floats go out as float32 when that's this close, far below anything a chart or hover label shows
+FLOAT32_RTOL = 1e-6
+
+iso_midnight = re.compile(r"^\d{4}-\d{2}-\d{2}T00:00:00$")
+
+
+# plotly.js typed array spec, e.g. {"dtype": "i2", "bdata": "twBxAA=="}
+def typed_array(values):
+    return {"dtype": values.dtype.str[1:], "bdata": base64.b64encode(values.tobytes()).decode("ascii")}
+
+
+def decode_array(spec):
+    return np.frombuffer(base64.b64decode(spec["bdata"]), dtype=np.dtype(spec["dtype"]).newbyteorder("<"))
+
+
+# numbers as the narrowest typed array that holds them; None for anything else
+def compact_array(values):
+    if isinstance(values, dict) and "bdata" in values and "shape" not in values:
+        values = decode_array(values)
+    elif isinstance(values, list) and values and all(type(v) in (int, float) for v in values):
+        values = np.array(values)
+    else:
+        return None
+
+    if values.dtype.kind == "f" and np.isfinite(values).all() and (values == np.round(values)).all():
+        values = values.astype(np.int64)
+    if values.dtype.kind in "iu":
+        for dtype in INT_DTYPES:
+            info = np.iinfo(dtype)
+            if values.min(initial=0) >= info.min and values.max(initial=0) <= info.max:
+                return typed_array(values.astype(dtype))
+    if values.dtype.kind == "f":
+        single = values.astype(np.float32)
+        if np.allclose(single, values, rtol=FLOAT32_RTOL, atol=0, equal_nan=True):
+            return typed_array(single)
+        return typed_array(values.astype(np.float64))
+    return None
+
+
+# "2022-08-09T00:00:00" -> "2022-08-09"
+def compact_dates(values):
+    if isinstance(values, list) and values and all(isinstance(v, str) and iso_midnight.match(v) for v in values):
+        return [v[:10] for v in values]
+    return None
+
+
+# evenly spaced dates as (start, step in ms), or None
+def date_step(values):
+    if not isinstance(values, list) or len(values) < 3 or not all(isinstance(v, str) for v in values):
+        return None
+    try:
+        dates = np.array(values, dtype="datetime64[ms]")
+    except ValueError:
+        return None
+    steps = np.diff(dates).astype(np.int64)
+    if steps[0] <= 0 or (steps != steps[0]).any():
+        return None
+    return values[0], int(steps[0])
+
+
+def axis_name(ref):
+    # "x" -> "xaxis", "y2" -> "yaxis2"
+    return ref[0] + "axis" + ref[1:]
+
+
+def compact_trace(trace, layout):
+    trace = {key: value for key, value in trace.items() if TRACE_DEFAULTS.get(key, ()) != value}
+    for key, value in TYPE_DEFAULTS.get(trace.get("type"), {}).items():
+        if trace.get(key) == value:
+            del trace[key]
+
+    pattern = trace.get("marker", {}).get("pattern")
+    if pattern is not None and pattern.get("shape") == "" and len(pattern) == 1:
+        trace["marker"] = {key: value for key, value in trace["marker"].items() if key != "pattern"}
+
+    for letter in "xy":
+        values = trace.get(letter)
+        step = date_step(values) if trace.get("type", "scatter") in STEP_TRACES else None
+        if step is not None:
+            # the axis can't be guessed from a missing array, so it's pinned to dates
+            del trace[letter]
+            trace[letter + "0"], trace["d" + letter] = step[0][:10] if iso_midnight.match(step[0]) else step[0], step[1]
+            axis = layout.setdefault(axis_name(trace.get(letter + "axis", letter)), {})
+            axis.setdefault("type", "date")
+            continue
+
+        for encode in (compact_array, compact_dates):
+            compacted = encode(values)
+            if compacted is not None:
+                trace[letter] = compacted
+                break
+
+    for key in ("values", "z"):
+        compacted = compact_array(trace.get(key))
+        if compacted is not None:
+            trace[key] = compacted
+    return trace
+
+
+# smaller figure JSON that draws the same: narrow typed arrays, date steps instead of date
+# lists, default attributes dropped and template defaults kept only for trace types in use
+def compact_figure(fig):
+    fig = json.loads(fig) if isinstance(fig, str) else fig
+    layout = json.loads(json.dumps(fig.get("layout", {})))
+    data = [compact_trace(trace, layout) for trace in fig.get("data", [])]
+
+    template = layout.get("template")
+    if template and "data" in template:
+        used = {trace.get("type", "scatter") for trace in data}
+        template["data"] = {kind: value for kind, value in template["data"].items() if kind in used}
+
+    return dict(fig, data=data, layout=layout)
+
+
+def compact_json(fig):
+    return json.dumps(compact_figure(fig), separators=(",", ":"))
+
+
+# precompressed variants by content coding, best first; brotli only when the module is there
+def encodings():
+    return [("br", ".br")] * (brotli is not None) + [("gzip", ".gz")]
+
+
+# every variant suffix, including .br written on a machine that had brotli
+VARIANT_SUFFIXES = (".br", ".gz")
+
+
+# best compression for files written once, fast settings for responses compressed per request
+def compress(content, coding, fast=False):
+    if coding == "br":
+        return brotli.compress(content, quality=5 if fast else 11)
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(content, compresslevel=6 if fast else 9, mtime=0)
+
+
+# writes path.gz (and path.br) next to path; sizes in bytes by coding, "identity" for the original
+def write_compressed(path):
+    with open(path, "rb") as file:
+        content = file.read()
+
+    sizes = {"identity": len(content)}
+    for coding, suffix in encodings():
+        compressed = compress(content, coding)
+        with open(path + suffix, "wb") as file:
+            file.write(compressed)
+        sizes[coding] = len(compressed)
+    return sizes
+
+
+# drops path's variants, once the original is written without them
+def remove_compressed(path):
+    for suffix in VARIANT_SUFFIXES:
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+# codings an Accept-Encoding header allows, e.g. "gzip, deflate, br" -> {"gzip", "deflate", "br"}
+def accepted_codings(accept_encoding):
+    return {part.split(";")[0].strip() for part in (accept_encoding or "").split(",")
+            if part.replace(" ", "").split(";")[-1] not in ("q=0", "q=0.0")}
+
+
+# the precompressed file to send for an Accept-Encoding header, as (path, coding); a variant
+# older than the original is from an earlier export and never sent
+def pick_variant(path, accept_encoding):
+    accepted = accepted_codings(accept_encoding)
+    for coding, suffix in encodings():
+        if coding in accepted and os.path.exists(path + suffix) and \
+                os.path.getmtime(path + suffix) >= os.path.getmtime(path):
+            return path + suffix, coding
+    return path, None
@@ -0,0 +1,117 @@
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+
+from scratch.storage import read_results, is_arrow_path, is_partitioned, partition_files
+from scratch.cube import CountCube, build_cube, merge_cubes, empty_cube
+from scratch.metrics import timed
+
+# engine that counts the cube: "duckdb" or "pandas"; "auto" is duckdb when it's
+# installed and pandas otherwise (DASHJOURNEY_BACKEND does the same under a WSGI server)
+BACKEND = os.environ.get("DASHJOURNEY_BACKEND") or "auto"
+
+CUBE_COLUMNS = ["Date_Applied", "Broad_Role", "Result"]
+
+# the one aggregation every figure is drawn from: role, DOW, month, pie and time series totals
+# are all sums over this (day, role, result) table, so it's the only query any engine runs
+CELLS_SQL = """
+SELECT Date_Applied, Broad_Role, Result, COUNT(*) AS n
+FROM results
+GROUP BY Date_Applied, Broad_Role, Result
+"""
+
+
+# raises ValueError up front for a backend that can't run here, rather than on the first page load
+def configure(backend=None):
+    global BACKEND
+
+    resolve_backend(backend)
+    BACKEND = backend or BACKEND
+
+
+def resolve_backend(backend=None):
+    backend = backend or BACKEND
+    has_duckdb = importlib.util.find_spec("duckdb") is not None
+    if backend == "auto":
+        return "duckdb" if has_duckdb else "pandas"
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown query backend {backend!r}, expected auto or one of {', '.join(BACKENDS)}")
+    if backend == "duckdb" and not has_duckdb:
+        raise ValueError("the duckdb backend needs the duckdb package (pip install duckdb)")
+    return backend
+
+
+# a partitioned dataset's month files overlapping [start, end], or the one results file
+def results_files(path, start=None, end=None):
+    return partition_files(path, start, end) if is_partitioned(path) else [path]
+
+
+# Arrow record batches of the cube columns, memory-mapped one at a time
+def record_batches(files, columns=CUBE_COLUMNS):
+    import pyarrow as pa
+    from pyarrow import ipc
+
+    for path in files:
+        with pa.memory_map(path) as source:
+            reader = ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).select(columns)
+
+
+# a column's values in dictionary order, so every engine lays the cube's axes out like build_cube
+def axis_values(files, column):
+    import pyarrow as pa
+
+    values = {}
+    for batch in record_batches(files, [column]):
+        array = batch.column(0)
+        values.update(dict.fromkeys((array.dictionary if pa.types.is_dictionary(array.type) else array.unique()).to_pylist()))
+    return pd.Index([value for value in values if value is not None])
+
+
+# (Date_Applied, Broad_Role, Result, n) rows from CELLS_SQL into a CountCube
+def cells_cube(cells, roles, results):
+    if not len(cells):
+        return CountCube(pd.DatetimeIndex([]), roles, results, np.zeros((0, len(roles), len(results)), dtype=np.int64))
+
+    days = pd.to_datetime(cells["Date_Applied"]).values.astype("datetime64[ns]")
+    dates = pd.date_range(days.min(), days.max())
+    counts = np.zeros((len(dates), len(roles), len(results)), dtype=np.int64)
+    counts[(days - dates.values[0]) // np.timedelta64(1, "D"),
+           roles.get_indexer(cells["Broad_Role"]), results.get_indexer(cells["Result"])] = cells["n"].values
+    return CountCube(dates, roles, results, counts)
+
+
+# scans the Arrow files in place, streaming and on every core
+def duckdb_cube(files):
+    import duckdb
+    from pyarrow import dataset
+
+    results = dataset.dataset(files, format="ipc")
+    with duckdb.connect() as connection:
+        connection.register("results", results)
+        cells = connection.execute(CELLS_SQL).df()
+    return cells_cube(cells, axis_values(files, "Broad_Role"), axis_values(files, "Result"))
+
+
+# the in-memory path: one file's columns at a time through build_cube
+def pandas_cube(files):
+    cube = empty_cube()
+    for path in files:
+        cube = merge_cubes(cube, build_cube(read_results(path, CUBE_COLUMNS)))
+    return cube
+
+
+BACKENDS = {"duckdb": duckdb_cube, "pandas": pandas_cube}
+
+
+# one query over every file, so the SQL engines see the whole dataset (or date range) at once
+@timed("query_cube")
+def query_cube(path, backend=None, start=None, end=None):
+    # a csv has to be parsed whole anyway
+    if not is_partitioned(path) and not is_arrow_path(path):
+        return build_cube(read_results(path))
+    files = results_files(path, start, end)
+    return BACKENDS[resolve_backend(backend)](files) if files else empty_cube()
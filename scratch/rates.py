@@ -0,0 +1,72 @@
+import pandas as pd
+import numpy as np
+from collections import namedtuple
+
+# running totals over the day axis: prefix[i] counts everything before dates[i], so any
+# window of days is one subtraction and a new window size costs nothing to add
+RatePrefix = namedtuple("RatePrefix", ["dates", "names", "prefix"])
+
+# what counts toward each rate, picked out of the cube's Result axis
+RATES = {"Response": lambda results: results != "No Response",
+         "Interview": lambda results: results.str.contains("(?i)Interview|Offer", regex=True),
+         "Rejection": lambda results: results == "Rejected"}
+
+RATE_WINDOWS = [7, 30]
+
+
+# applications per day, then applications per day that count toward each rate
+def daily_rate_counts(cube, rates=RATES):
+    by_result = cube.counts.sum(axis=1)
+    columns = [by_result.sum(axis=1)] + [by_result[:, np.asarray(match(cube.results), dtype=bool)].sum(axis=1)
+                                         for match in rates.values()]
+    return np.column_stack(columns) if len(cube.dates) else np.zeros((0, len(rates) + 1), dtype=np.int64)
+
+
+def rate_prefix(cube, rates=RATES):
+    daily = daily_rate_counts(cube, rates)
+    prefix = np.zeros((len(daily) + 1, daily.shape[1]), dtype=np.int64)
+    np.cumsum(daily, axis=0, out=prefix[1:])
+    return RatePrefix(cube.dates, list(rates), prefix)
+
+
+# fold in a cube of newly appended rows; only days from its first one on are touched
+def extend_rate_prefix(running, cube, rates=RATES):
+    if not len(running.dates):
+        return rate_prefix(cube, rates)
+    if not len(cube.dates):
+        return running
+    if cube.dates[0] < running.dates[-1]:
+        raise ValueError("can only extend with rows on or after the last day already counted")
+
+    dates = pd.date_range(running.dates[0], max(running.dates[-1], cube.dates[-1]))
+    offset = dates.get_loc(cube.dates[0])
+    daily = daily_rate_counts(cube, rates)
+
+    prefix = np.empty((len(dates) + 1, daily.shape[1]), dtype=np.int64)
+    prefix[:len(running.prefix)] = running.prefix
+    prefix[len(running.prefix):] = running.prefix[-1]
+    prefix[offset + 1:offset + 1 + len(daily)] += np.cumsum(daily, axis=0)
+    prefix[offset + 1 + len(daily):] += daily.sum(axis=0)
+
+    return RatePrefix(dates, running.names, prefix)
+
+
+# share of the applications in the trailing `window` days that count toward each rate
+def rolling_rates(running, window):
+    prefix = running.prefix
+    end = np.arange(1, len(prefix))
+    sums = prefix[end] - prefix[np.maximum(end - window, 0)]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rates = sums[:, 1:] / sums[:, :1]
+    rates[sums[:, 0] == 0] = np.nan
+
+    return pd.DataFrame(rates, index=running.dates, columns=running.names)
+
+
+# the log only records when an application went out, not when it was answered, so this is
+# how long each still-unanswered application has been waiting as of the last day in the log
+def waiting_days(cube, pattern="No Response"):
+    waiting = cube.counts[:, :, np.asarray(cube.results == pattern)].sum(axis=(1, 2))
+    age = (cube.dates[-1] - cube.dates).days if len(cube.dates) else np.zeros(0, dtype=np.int64)
+    return pd.Series(waiting, index=pd.Index(np.asarray(age), name="days")).iloc[::-1]
@@ -0,0 +1,313 @@
+import pandas as pd
+import numpy as np
+from pandas.api.types import union_categoricals
+import hashlib
+import json
+import os
+
+from scratch.metrics import timed
+
+DOW_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# results columns and the dtypes every backend hands back
+RESULTS_SCHEMA = {"Date_Applied": "datetime64[ns]",
+                  "Result": "category",
+                  "DOW": pd.CategoricalDtype(DOW_ORDER),
+                  "year_month": "period[M]",
+                  "Broad_Role": "category"}
+
+ARROW_SUFFIXES = (".arrow", ".feather")
+CSV_SUFFIXES = (".csv",)
+
+# a path without a suffix is a directory of one Arrow file per year_month plus this manifest
+MANIFEST_NAME = "manifest.json"
+PARTITION_SUFFIX = ".arrow"
+
+
+def is_arrow_path(path):
+    return path.endswith(ARROW_SUFFIXES)
+
+
+def is_partitioned(path):
+    return not os.path.splitext(path.rstrip("/"))[1]
+
+
+# anything but a directory, Arrow or CSV would otherwise be read and written as CSV
+def check_results_path(path):
+    if not (is_partitioned(path) or is_arrow_path(path) or path.endswith(CSV_SUFFIXES)):
+        raise ValueError(f"unsupported results path {path!r}: expected a directory, "
+                         f"or a file ending in {', '.join(ARROW_SUFFIXES + CSV_SUFFIXES)}")
+
+
+# the file that changes whenever the results do
+def version_path(path):
+    return os.path.join(path, MANIFEST_NAME) if is_partitioned(path) else path
+
+
+def apply_schema(df):
+    df = df.copy()
+    for column, dtype in RESULTS_SCHEMA.items():
+        if column not in df:
+            continue
+        if dtype == "period[M]" and not isinstance(df[column].dtype, pd.PeriodDtype):
+            # parsing "2022-08" strings is slow; the month is already in the date
+            if "Date_Applied" in df:
+                df[column] = pd.to_datetime(df["Date_Applied"]).dt.to_period("M")
+            else:
+                df[column] = pd.PeriodIndex(df[column].astype(str), freq="M")
+        elif df[column].dtype != dtype:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def concat_results(frames):
+    # union categoricals so appended rows keep the existing category order
+    frames = [frame for frame in frames if len(frame.columns)]
+    df = pd.concat(frames, ignore_index=True)
+    for column in df.columns:
+        parts = [frame[column] for frame in frames]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts) and len(parts) > 1:
+            df[column] = pd.Series(union_categoricals(parts), index=df.index)
+    return df
+
+
+@timed("write_results")
+def write_results(df, path):
+    check_results_path(path)
+    df = apply_schema(df)
+
+    if is_partitioned(path):
+        write_partitions(df, path)
+        return
+
+    if not is_arrow_path(path):
+        df.to_csv(path)
+        return
+
+    # uncompressed IPC so readers can memory-map the columns as-is
+    from pyarrow import feather
+
+    tmp_path = path + ".tmp"
+    feather.write_feather(df.reset_index(drop=True), tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+
+@timed("append_results")
+def append_results(df, path):
+    check_results_path(path)
+    if is_partitioned(path):
+        append_partitions(apply_schema(df), path)
+        return
+
+    if not is_arrow_path(path):
+        apply_schema(df).to_csv(path, mode="a", header=False)
+        return
+
+    # IPC files are immutable, so appends rewrite the file from the mapped table
+    write_results(concat_results([read_results(path), apply_schema(df)]), path)
+
+
+# rows from `start` on; with Arrow only those rows are converted, and a partitioned
+# dataset only opens the partitions holding them (and overlapping date_range, if given)
+@timed("read_results")
+def read_results(path, columns=None, start=0, date_range=None):
+    check_results_path(path)
+    if is_partitioned(path):
+        return read_partitions(path, columns, start, date_range)
+
+    if not is_arrow_path(path):
+        df = pd.read_csv(path, index_col=0)
+        return apply_schema(df[columns] if columns is not None else df).iloc[start:]
+
+    from pyarrow import feather
+
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    return table.slice(start).to_pandas(split_blocks=True)
+
+
+# the whole results table as a csv, whatever it's stored as (app.py export --csv)
+def export_csv(path, csv_path):
+    read_results(path).to_csv(csv_path)
+
+
+def read_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST_NAME), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {"partitions": {}, "runs": [], "roles": [], "results": []}
+
+
+def write_manifest(path, manifest):
+    tmp_path = os.path.join(path, MANIFEST_NAME + ".tmp")
+    # dumps rather than dump: only the former gets the C encoder
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(json.dumps(manifest, separators=(",", ":")))
+    os.replace(tmp_path, os.path.join(path, MANIFEST_NAME))
+
+
+# what the manifest knows about one month without opening it
+def partition_summary(df, file_name, sha1):
+    counts = df.groupby(["Broad_Role", "Result"], observed=True).size()
+    return {"file": file_name,
+            "rows": len(df),
+            "first": df["Date_Applied"].min().strftime("%Y-%m-%d"),
+            "last": df["Date_Applied"].max().strftime("%Y-%m-%d"),
+            "sha1": sha1,
+            "counts": {role: {result: int(n) for result, n in group.droplevel(0).items()}
+                       for role, group in counts.groupby(level=0, observed=True)}}
+
+
+# one month's rows; returns its manifest entry
+def write_partition(df, path, month, old=None):
+    import pyarrow as pa
+    from pyarrow import feather
+
+    # written to memory first, so a partition whose bytes didn't change keeps its file (and mtime)
+    sink = pa.BufferOutputStream()
+    feather.write_feather(df.reset_index(drop=True), sink, compression="uncompressed")
+    content = sink.getvalue().to_pybytes()
+    sha1 = hashlib.sha1(content).hexdigest()
+
+    file_name = month + PARTITION_SUFFIX
+    if old is None or old["sha1"] != sha1 or not os.path.exists(os.path.join(path, file_name)):
+        tmp_path = os.path.join(path, file_name + ".tmp")
+        with open(tmp_path, "wb") as file:
+            file.write(content)
+        os.replace(tmp_path, os.path.join(path, file_name))
+
+    return partition_summary(df, file_name, sha1)
+
+
+# months in row order as (month, rows) runs, so a log that isn't in date order reads back as written
+def month_runs(months):
+    codes = months.asi8
+    if not len(codes):
+        return []
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    lengths = np.diff(np.r_[starts, len(codes)])
+    # formatting a Period is slow, so each distinct month is only formatted once
+    unique, inverse = np.unique(codes[starts], return_inverse=True)
+    names = np.asarray(pd.PeriodIndex.from_ordinals(unique, freq="M").astype(str), dtype=object)[inverse]
+    return [[name, int(length)] for name, length in zip(names, lengths.tolist())]
+
+
+# (month, rows of that month in their original order) for each month in df
+def split_months(df):
+    months = pd.PeriodIndex(df["year_month"])
+    order = np.argsort(months.asi8, kind="stable")
+    bounds = np.flatnonzero(np.diff(months.asi8[order])) + 1
+    for rows in np.split(order, bounds) if len(order) else []:
+        yield str(months[rows[0]]), df.iloc[rows]
+
+
+def write_partitions(df, path):
+    os.makedirs(path, exist_ok=True)
+    old = read_manifest(path)
+    manifest = {"partitions": {}, "runs": [],
+                "roles": [str(role) for role in df["Broad_Role"].cat.categories],
+                "results": [str(result) for result in df["Result"].cat.categories]}
+
+    manifest["runs"] = month_runs(pd.PeriodIndex(df["year_month"]))
+    for month, rows in split_months(df):
+        manifest["partitions"][month] = write_partition(rows, path, month, old["partitions"].get(month))
+
+    write_manifest(path, manifest)
+    for month, partition in old["partitions"].items():
+        if month not in manifest["partitions"]:
+            os.remove(os.path.join(path, partition["file"]))
+
+
+def append_partitions(df, path):
+    if not os.path.exists(os.path.join(path, MANIFEST_NAME)):
+        write_partitions(df, path)
+        return
+
+    manifest = read_manifest(path)
+    runs = month_runs(pd.PeriodIndex(df["year_month"]))
+    if manifest["runs"] and runs and manifest["runs"][-1][0] == runs[0][0]:
+        manifest["runs"][-1][1] += runs.pop(0)[1]
+    manifest["runs"] += runs
+
+    # only the months getting rows are rewritten
+    for month, new in split_months(df):
+        old = manifest["partitions"].get(month)
+        if old is not None:
+            new = concat_results([read_partition(path, manifest, month), new])
+        manifest["partitions"][month] = write_partition(new, path, month, old)
+
+    for axis, column in (("roles", "Broad_Role"), ("results", "Result")):
+        manifest[axis] += [str(value) for value in df[column].cat.categories if str(value) not in manifest[axis]]
+    write_manifest(path, manifest)
+
+
+def partition_table(path, manifest, month, columns=None):
+    from pyarrow import feather
+
+    return feather.read_table(os.path.join(path, manifest["partitions"][month]["file"]), columns=columns, memory_map=True)
+
+
+def read_partition(path, manifest, month, columns=None):
+    return partition_table(path, manifest, month, columns).to_pandas(split_blocks=True)
+
+
+# months whose dates overlap [start, end]; either end can be None
+def partitions_between(manifest, start=None, end=None):
+    start = pd.Timestamp(start).strftime("%Y-%m-%d") if start else None
+    end = pd.Timestamp(end).strftime("%Y-%m-%d") if end else None
+    return [month for month, partition in sorted(manifest["partitions"].items())
+            if (start is None or partition["last"] >= start) and (end is None or partition["first"] <= end)]
+
+
+def partition_files(path, start=None, end=None):
+    manifest = read_manifest(path)
+    return [os.path.join(path, manifest["partitions"][month]["file"]) for month in partitions_between(manifest, start, end)]
+
+
+def read_partitions(path, columns=None, start=0, date_range=None):
+    import pyarrow as pa
+
+    manifest = read_manifest(path)
+    months = set(partitions_between(manifest, *date_range) if date_range else manifest["partitions"])
+    wanted = columns
+    if columns is not None and date_range and "Date_Applied" not in columns:
+        columns = list(columns) + ["Date_Applied"]
+
+    # walk the runs to find where each one's rows sit in its partition, skipping anything before start
+    kept, consumed, row = [], {}, 0
+    for month, rows in manifest["runs"]:
+        first = consumed.get(month, 0)
+        consumed[month] = first + rows
+        skip = min(max(start - row, 0), rows)
+        row += rows
+        if month in months and skip < rows:
+            kept.append((month, first + skip, rows - skip))
+
+    if not kept:
+        empty = read_partition(path, manifest, next(iter(manifest["partitions"])), columns) if manifest["partitions"] else pd.DataFrame()
+        return empty.iloc[:0] if wanted is None else empty.iloc[:0][list(wanted)]
+
+    # joined as Arrow tables, so there's one conversion to pandas with the categories unified once
+    needed = sorted({month for month, _, _ in kept})
+    tables = [partition_table(path, manifest, month, columns) for month in needed]
+    offsets = dict(zip(needed, np.cumsum([0] + [len(table) for table in tables])))
+    table = pa.concat_tables(tables, promote_options="permissive")
+
+    # then gather the rows back into log order; a log in date order has one run per month,
+    # so the partitions back to back already are
+    counts = np.array([rows for _, _, rows in kept])
+    firsts = np.array([offsets[month] + first for month, first, _ in kept])
+    index = np.repeat(firsts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    if len(index) != len(table) or (index != np.arange(len(table))).any():
+        table = table.take(index)
+    df = table.to_pandas(split_blocks=True)
+
+    if date_range:
+        low, high = date_range
+        mask = np.ones(len(df), dtype=bool)
+        if low:
+            mask &= (df["Date_Applied"] >= pd.Timestamp(low)).values
+        if high:
+            mask &= (df["Date_Applied"] <= pd.Timestamp(high)).values
+        df = df[mask].reset_index(drop=True)
+    return df if wanted is None else df[list(wanted)]
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+
+# what the log looks like on disk; None while it's missing (e.g. mid-save by an editor)
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# polls the log on an asyncio loop in a background thread and calls on_change once a burst of
+# edits has been quiet for `debounce` seconds; edits made while on_change runs get their own call
+class LogWatcher:
+
+    def __init__(self, path, on_change, interval=0.5, debounce=1.0):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.debounce = debounce
+        self.rebuilds = 0
+        self.thread = None
+        self.loop = None
+        self.stopped = None
+
+    async def watch(self):
+        seen = file_signature(self.path)
+        changed_at = None
+
+        while not self.stopped.is_set():
+            signature = file_signature(self.path)
+            if signature != seen:
+                seen = signature
+                changed_at = time.monotonic()
+
+            if changed_at is not None and signature is not None and time.monotonic() - changed_at >= self.debounce:
+                changed_at = None
+                # off the loop, so edits landing during the rebuild are still noticed
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, self.on_change)
+                except Exception:
+                    logging.getLogger("dashjourney").exception(f"rebuild after {self.path} changed failed")
+                self.rebuilds += 1
+
+            try:
+                await asyncio.wait_for(self.stopped.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def run(self):
+        try:
+            self.loop.run_until_complete(self.watch())
+        finally:
+            self.loop.close()
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        self.stopped = asyncio.Event()
+        self.thread = threading.Thread(target=self.run, name="log-watcher", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.thread is not None:
+            self.loop.call_soon_threadsafe(self.stopped.set)
+            self.thread.join()